@@ -4,5 +4,6 @@ from aldryn_client import forms
 class Form(forms.BaseForm):
     def to_settings(self, data, settings):
         # No need to setup django-parler. That is already done in aldryn-django-cms
-        settings['MIDDLEWARE_CLASSES'].insert(0, 'aldryn_redirects.middleware.RedirectFallbackMiddleware')
+        middleware = 'MIDDLEWARE' if settings.get('MIDDLEWARE') is not None else 'MIDDLEWARE_CLASSES'
+        settings[middleware].insert(0, 'aldryn_redirects.middleware.RedirectFallbackMiddleware')
         return settings
@@ -1,11 +1,14 @@
 from __future__ import unicode_literals
 
-from tablib import Dataset
+from datetime import timedelta
 
 from django.conf import settings
-from django.contrib import admin, messages
-from django.core.urlresolvers import reverse
-from django.http import HttpResponse
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.sites.models import Site
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _, ugettext
@@ -14,39 +17,255 @@ from parler.admin import TranslatableAdmin
 
 from aldryn_translation_tools.admin import AllTranslationsMixin
 
-from .forms import RedirectsImportForm, StaticRedirectsImportForm
-from .models import Redirect, StaticRedirect, StaticRedirectInboundRouteQueryParam
+from .deletion import delete_in_chunks
+from .engines import find_redirect_loops
+from .exporters import RedirectExporter, StaticRedirectExporter
+from .forms import ImportJobForm, RedirectsImportForm, StaticRedirectsImportForm
+from .models import (
+    ImportJob, PrefixRedirect, Redirect, RegexRedirect, StaticRedirect, StaticRedirectInboundRouteQueryParam,
+)
+from .paginator import EstimatedCountPaginator
+
+try:
+    from django.urls import reverse
+except ImportError:  # COMPAT: Django < 1.10
+    from django.core.urlresolvers import reverse
+
+
+class LastHitListFilter(admin.SimpleListFilter):
+    """
+    Finds the rules nobody requested lately, to prune them.
+    """
+    title = _('last hit')
+    parameter_name = 'not_hit_for'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('30', _('Not hit for 30 days')),
+            ('90', _('Not hit for 90 days')),
+            ('365', _('Not hit for a year')),
+            ('never', _('Never hit')),
+        )
 
+    def queryset(self, request, queryset):
+        value = self.value()
 
-class DeletionMixin(object):
-    actions = ['delete_selected']
+        if value == 'never':
+            return queryset.filter(last_hit_at__isnull=True)
+        elif value:
+            since = timezone.now() - timedelta(days=int(value))
+            return queryset.filter(Q(last_hit_at__lt=since) | Q(last_hit_at__isnull=True))
+        return queryset
 
-    def delete_selected(self, request, queryset):
-        max_items_deletion = getattr(settings, 'DATA_UPLOAD_MAX_NUMBER_FIELDS', 1000)  # COMPAT: Django<1.10
 
-        if queryset.count() > max_items_deletion:
-            msg = _('Too many items for deletion. Only first {qty} items were deleted.').format(qty=max_items_deletion)
-            self.message_user(request, msg, level=messages.WARNING)
+class SitesListFilter(admin.SimpleListFilter):
+    """
+    Filters on the ``sites`` of a rule with a subquery on the many-to-many
+    table. Unlike the default filter it neither joins nor needs a DISTINCT
+    over the whole table.
+    """
+    title = _('sites')
+    # Same as the default filter, so existing links keep working.
+    parameter_name = 'sites__id__exact'
+
+    def lookups(self, request, model_admin):
+        return [(site.pk, site.domain) for site in Site.objects.order_by('domain')]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+
+        if value:
+            field = queryset.model._meta.get_field('sites')
+            remote_field = getattr(field, 'remote_field', None) or field.rel  # COMPAT: Django < 1.9
+            rows = remote_field.through.objects.filter(**{field.m2m_reverse_field_name(): value})
+            return queryset.filter(pk__in=rows.values(field.m2m_field_name()))
+        return queryset
+
+
+class LargeTableMixin(object):
+    """
+    Changelists of tables with up to millions of rows: estimated counts, and
+    no count of the unfiltered table.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class DeletionMixin(object):
+    actions = ['delete_selected']
 
-            # <Queryset>.delete() can not be used with sliced querysets
-            inner_qs = queryset.all()[:max_items_deletion]
-            queryset = queryset.filter(id__in=inner_qs)
+    def get_urls(self):
+        from django.conf.urls import url
 
-        deleted_qty = queryset.all().delete()[1]['aldryn_redirects.{}'.format(self.opts.model.__name__)]
+        info = self.opts.app_label, self.opts.model_name
+        url_patterns = [
+            url(
+                r'^delete-matching/$',
+                self.admin_site.admin_view(self.delete_matching_view),
+                name='{}_{}_delete_matching'.format(*info),
+            ),
+        ]
+        return url_patterns + super(DeletionMixin, self).get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+
+        if self.has_delete_permission(request):
+            url = reverse('admin:{}_{}_delete_matching'.format(self.opts.app_label, self.opts.model_name))
+            extra_context['delete_matching_url'] = '{}?{}'.format(url, request.GET.urlencode())
+        return super(DeletionMixin, self).changelist_view(request, extra_context)
+
+    def get_changelist_queryset(self, request):
+        """
+        Returns the rows the changelist shows for the filters and search of
+        request, on all pages.
+        """
+        if hasattr(self, 'get_changelist_instance'):
+            return self.get_changelist_instance(request).queryset
+
+        # COMPAT: Django < 2.0
+        list_display = self.get_list_display(request)
+        changelist = self.get_changelist(request)(
+            request, self.model, list_display, self.get_list_display_links(request, list_display),
+            self.get_list_filter(request), self.date_hierarchy, self.get_search_fields(request),
+            self.get_list_select_related(request), self.list_per_page, self.list_max_show_all, self.list_editable,
+            self,
+        )
+        return changelist.queryset
 
+    def message_deleted(self, request, deleted_qty):
         object_label = self.opts.verbose_name_plural if deleted_qty > 1 else self.opts.verbose_name
         msg = _('Successfully deleted {qty} {object_label}.').format(qty=deleted_qty, object_label=object_label)
         self.message_user(request, msg)
+
+    def delete_selected(self, request, queryset):
+        # "Select all" passes the whole changelist, however large.
+        self.message_deleted(request, delete_in_chunks(queryset))
     delete_selected.short_description = _('Delete selected objects')
 
+    def delete_matching_view(self, request):
+        """
+        Deletes every row matching the filters and search of the changelist,
+        after confirmation.
+        """
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+
+        opts = self.model._meta
+        changelist_url = '{}?{}'.format(
+            reverse('admin:{}_{}_changelist'.format(opts.app_label, opts.model_name)),
+            request.GET.urlencode(),
+        )
+
+        try:
+            queryset = self.get_changelist_queryset(request)
+        except IncorrectLookupParameters:
+            return redirect(changelist_url)
+
+        if request.method == 'POST':
+            self.message_deleted(request, delete_in_chunks(queryset))
+            return redirect(changelist_url)
+
+        context = {
+            'count': queryset.count(),
+            'changelist_url': changelist_url,
+            'opts': opts,
+            'app_label': opts.app_label,
+            'title': ugettext('Delete all matching'),
+        }
+        return render(request, 'admin/aldryn_redirects/delete_matching.html', context)
+
+
+class ImportJobMixin(object):
+    import_job_kind = None
+
+    def use_import_jobs(self):
+        return getattr(settings, 'ALDRYN_REDIRECTS_IMPORT_JOBS', False)
+
+    def import_job_view(self, request, template_name):
+        """
+        Stores the upload as an import job for process_redirect_import_jobs
+        and sends the user to its progress page.
+        """
+        form = ImportJobForm(
+            data=request.POST or None,
+            files=request.FILES or None,
+        )
+        opts = self.model._meta
+
+        if form.is_valid():
+            job = form.save(commit=False)
+            job.kind = self.import_job_kind
+            job.save()
+            self.message_user(request, _('Import queued, it runs in the background.'))
+            return redirect('admin:aldryn_redirects_importjob_change', job.pk)
+
+        context = {
+            'adminform': form,
+            'has_change_permission': True,
+            'media': self.media + form.media,
+            'opts': opts,
+            'root_path': reverse('admin:index'),
+            'current_app': self.admin_site.name,
+            'app_label': opts.app_label,
+            'title': ugettext('Import redirects'),
+            'original': ugettext('Import redirects'),
+            'errors': form.errors,
+        }
+        return render(request, template_name, context)
+
+
+class RedirectLoopsMixin(object):
+
+    def loops_view(self, request):
+        """
+        Lists the loops between static and multilanguage redirects, which the
+        middleware answers with the first hop only.
+        """
+        site_loops = []
+
+        for site in Site.objects.order_by('domain'):
+            loops = [
+                [(match, self.get_rule_change_url(match)) for match in loop]
+                for loop in find_redirect_loops(site.pk)
+            ]
+            if loops:
+                site_loops.append((site, loops))
+
+        opts = self.model._meta
+        context = {
+            'site_loops': site_loops,
+            'opts': opts,
+            'app_label': opts.app_label,
+            'title': ugettext('Redirect loops'),
+        }
+        return render(request, 'admin/aldryn_redirects/redirect_loops.html', context)
+
+    def get_rule_change_url(self, match):
+        models = {
+            'static': StaticRedirect,
+            'redirect': Redirect,
+            'regex': RegexRedirect,
+            'prefix': PrefixRedirect,
+        }
+        model = models[match.kind]
+        return reverse('admin:{}_{}_change'.format(model._meta.app_label, model._meta.model_name), args=(match.pk,))
+
 
-class RedirectAdmin(DeletionMixin, AllTranslationsMixin, TranslatableAdmin):
-    list_display = ('old_path',)
-    list_filter = ('site',)
+class RedirectAdmin(
+    LargeTableMixin, DeletionMixin, ImportJobMixin, RedirectLoopsMixin, AllTranslationsMixin, TranslatableAdmin,
+):
+    list_display = ('old_path', 'hit_count', 'last_hit_at')
+    list_filter = ('site', LastHitListFilter)
     search_fields = ('old_path', 'translations__new_path')
     radio_fields = {'site': admin.VERTICAL}
     export_filename = 'redirects-%Y-%m-%d.csv'
-    export_headers = ['Domain', 'Old', 'New', 'Language']
+    exporter_class = RedirectExporter
+    import_job_kind = ImportJob.REDIRECT
+
+    def get_queryset(self, request):
+        # The translations column lists the languages of every row.
+        return super(RedirectAdmin, self).get_queryset(request).prefetch_related('translations')
 
     def get_urls(self):
         from django.conf.urls import url
@@ -59,6 +278,7 @@ class RedirectAdmin(DeletionMixin, AllTranslationsMixin, TranslatableAdmin):
         url_patterns = [
             pattern(r'export/$', self.export_view, 'export'),
             pattern(r'import/$', self.import_view, 'import'),
+            pattern(r'loops/$', self.loops_view, 'loops'),
         ]
         return url_patterns + super(RedirectAdmin, self).get_urls()
 
@@ -77,26 +297,20 @@ class RedirectAdmin(DeletionMixin, AllTranslationsMixin, TranslatableAdmin):
         return form
 
     def export_view(self, request):
-        dataset = Dataset(headers=self.export_headers)
         filename = timezone.now().date().strftime(self.export_filename)
-        redirects = self.get_queryset(request).prefetch_related('translations')
-
-        for r in redirects:
-            rows = []
-            for translation in r.translations.all():
-                rows.append([
-                    r.site.domain,
-                    r.old_path,
-                    translation.new_path,
-                    translation.language_code,
-                ])
-            dataset.extend(rows)
-
-        response = HttpResponse(dataset.csv, content_type='text/csv; charset=utf-8')
+        exporter = self.exporter_class()
+
+        response = StreamingHttpResponse(
+            exporter.export_to_csv(self.get_queryset(request)),
+            content_type='text/csv; charset=utf-8',
+        )
         response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
         return response
 
     def import_view(self, request):
+        if self.use_import_jobs():
+            return self.import_job_view(request, 'admin/aldryn_redirects/redirect/import_form.html')
+
         form = RedirectsImportForm(
             data=request.POST or None,
             files=request.FILES or None,
@@ -106,8 +320,11 @@ class RedirectAdmin(DeletionMixin, AllTranslationsMixin, TranslatableAdmin):
         if form.is_valid():
             url_name = "%s_%s_%s" % (self.opts.app_label, self.opts.model_name, 'changelist')
             success_url = 'admin:{}'.format(url_name)
-            form.do_import()
+            result = form.do_import()
             self.message_user(request, _('Redirects imported successfully.'))
+            if result:
+                msg = _('{created} created, {updated} updated, {unchanged} unchanged.').format(**result)
+                self.message_user(request, msg)
             return redirect(success_url)
 
         context = {
@@ -132,16 +349,17 @@ class StaticRedirectInboundRouteQueryParamInline(admin.TabularInline):
     extra = 1
 
 
-class StaticRedirectAdmin(DeletionMixin, admin.ModelAdmin):
+class StaticRedirectAdmin(LargeTableMixin, DeletionMixin, ImportJobMixin, RedirectLoopsMixin, admin.ModelAdmin):
     inlines = [StaticRedirectInboundRouteQueryParamInline]
     filter_horizontal = ('sites',)
-    list_filter = ('sites',)
-    list_display = ('inbound_route', 'outbound_route')
-    search_fields = list_display
+    list_filter = (SitesListFilter, 'eager', LastHitListFilter)
+    list_display = ('inbound_route', 'outbound_route', 'eager', 'hit_count', 'last_hit_at')
+    search_fields = ('inbound_route', 'outbound_route')
 
     # Custom attributes
     export_filename = 'static-redirects-%Y-%m-%d.csv'
-    export_headers = ['domain', 'inbound_route', 'outbound_route']
+    exporter_class = StaticRedirectExporter
+    import_job_kind = ImportJob.STATIC_REDIRECT
 
     def get_urls(self):
         from django.conf.urls import url
@@ -154,6 +372,7 @@ class StaticRedirectAdmin(DeletionMixin, admin.ModelAdmin):
         url_patterns = [
             pattern(r'export/$', self.export_view, 'export'),
             pattern(r'import/$', self.import_view, 'import'),
+            pattern(r'loops/$', self.loops_view, 'loops'),
         ]
         return url_patterns + super(StaticRedirectAdmin, self).get_urls()
 
@@ -172,24 +391,20 @@ class StaticRedirectAdmin(DeletionMixin, admin.ModelAdmin):
         return form
 
     def export_view(self, request):
-        dataset = Dataset(headers=self.export_headers)
         filename = timezone.now().date().strftime(self.export_filename)
+        exporter = self.exporter_class()
 
-        for r in self.get_queryset(request):
-            rows = []
-            for site in r.sites.all():
-                rows.append([
-                    site.domain,
-                    r.get_full_inbound_route(),
-                    r.outbound_route,
-                ])
-            dataset.extend(rows)
-
-        response = HttpResponse(dataset.csv, content_type='text/csv; charset=utf-8')
+        response = StreamingHttpResponse(
+            exporter.export_to_csv(self.get_queryset(request)),
+            content_type='text/csv; charset=utf-8',
+        )
         response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
         return response
 
     def import_view(self, request):
+        if self.use_import_jobs():
+            return self.import_job_view(request, 'admin/aldryn_redirects/staticredirect/import_form.html')
+
         form = StaticRedirectsImportForm(
             data=request.POST or None,
             files=request.FILES or None,
@@ -199,8 +414,11 @@ class StaticRedirectAdmin(DeletionMixin, admin.ModelAdmin):
         if form.is_valid():
             url_name = "%s_%s_%s" % (self.opts.app_label, self.opts.model_name, 'changelist')
             success_url = 'admin:{}'.format(url_name)
-            form.do_import()
+            result = form.do_import()
             self.message_user(request, _('Redirects imported successfully.'))
+            if result:
+                msg = _('{created} created, {updated} updated, {unchanged} unchanged.').format(**result)
+                self.message_user(request, msg)
             return redirect(success_url)
 
         context = {
@@ -218,5 +436,57 @@ class StaticRedirectAdmin(DeletionMixin, admin.ModelAdmin):
         return render(request, 'admin/aldryn_redirects/staticredirect/import_form.html', context)
 
 
+class PrefixRedirectAdmin(DeletionMixin, admin.ModelAdmin):
+    filter_horizontal = ('sites',)
+    list_filter = (SitesListFilter, 'keep_remainder')
+    list_display = ('inbound_prefix', 'outbound_route', 'keep_remainder')
+    search_fields = ('inbound_prefix', 'outbound_route')
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super(PrefixRedirectAdmin, self).get_form(request, obj=None, **kwargs)
+        sites_field = form.base_fields['sites']
+
+        sites_field.widget.can_add_related = False
+        sites_field.widget.can_change_related = False
+
+        # if there is only one site, select it by default
+        if sites_field.queryset.all().count() == 1:
+            sites_field.initial = [sites_field.queryset.get(), ]
+        return form
+
+
+class RegexRedirectAdmin(PrefixRedirectAdmin):
+    list_filter = (SitesListFilter,)
+    list_display = ('pattern', 'replacement')
+    search_fields = list_display
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'progress', 'created_count', 'updated_count', 'unchanged_count', 'created_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = (
+        'kind', 'csv_file', 'status', 'progress', 'total_rows', 'processed_rows',
+        'created_count', 'updated_count', 'unchanged_count', 'errors', 'created_at', 'updated_at',
+    )
+    fields = readonly_fields
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        return '{}% ({}/{})'.format(obj.get_progress(), obj.processed_rows, obj.total_rows or '?')
+    progress.short_description = _('progress')
+
+    def retry(self, request, queryset):
+        # Committed rows are kept, retried jobs resume where they stopped.
+        retried = queryset.filter(status=ImportJob.FAILED).update(status=ImportJob.PENDING, errors='')
+        self.message_user(request, _('{qty} import jobs queued again.').format(qty=retried))
+    retry.short_description = _('Retry failed jobs')
+
+
+admin.site.register(ImportJob, ImportJobAdmin)
 admin.site.register(Redirect, RedirectAdmin)
 admin.site.register(StaticRedirect, StaticRedirectAdmin)
+admin.site.register(PrefixRedirect, PrefixRedirectAdmin)
+admin.site.register(RegexRedirect, RegexRedirectAdmin)
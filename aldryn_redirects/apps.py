@@ -5,3 +5,12 @@ from django.apps import AppConfig
 class AldrynRedirects(AppConfig):
     name = 'aldryn_redirects'
     verbose_name = 'Aldryn Redirects'
+
+    def ready(self):
+        from django.core import checks
+
+        from .checks import check_redirects_cache
+        from .signals import connect_signals
+
+        connect_signals()
+        checks.register(check_redirects_cache)
@@ -0,0 +1,62 @@
+"""
+Async path of ``RedirectFallbackMiddleware``, Python 3.5+ only.
+"""
+from timeit import default_timer
+
+from django.conf import settings
+
+from .engines import UNRESOLVED, get_engine, is_excluded_path
+from .hits import hit_counter
+from .metrics import get_sink
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:  # COMPAT: Django < 3.0, whose middleware is never called asynchronously
+    sync_to_async = None
+
+
+class AsyncMiddlewareMixin(object):
+    """
+    Django (3.1+) calls ``__acall__`` instead of ``__call__`` in async
+    middleware chains. Requests the engine resolves from memory are answered
+    in the event loop; only the others are resolved in a thread.
+    """
+
+    async def __acall__(self, request):
+        response = await self.aprocess_request(request)
+
+        if response is None:
+            response = await self.get_response(request)
+            response = await self.aprocess_response(request, response)
+        return response
+
+    async def aprocess_request(self, request):
+        return self.get_redirect_response(await self.aresolve(self.get_request_engine(), request))
+
+    async def aprocess_response(self, request, response):
+        if self.should_resolve_response(response):
+            return self.get_redirect_response(await self.aresolve(get_engine(), request)) or response
+        return response
+
+    async def aresolve(self, engine, request):
+        sink = get_sink()
+
+        if is_excluded_path(request.path_info):
+            sink.increment('lookups.excluded')
+            return None
+
+        started = default_timer()
+        match = engine.resolve_nowait(request)
+
+        if match is UNRESOLVED:
+            match = await sync_to_async(engine.resolve)(request)
+
+        if sink.enabled:
+            self.record_lookup(sink, match, default_timer() - started)
+
+        if match is not None and getattr(settings, 'ALDRYN_REDIRECTS_COUNT_HITS', True):
+            hit_counter.record(match, flush=False)
+
+            if hit_counter.is_flush_due():
+                await sync_to_async(hit_counter.flush)()
+        return match
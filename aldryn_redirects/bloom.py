@@ -0,0 +1,45 @@
+from __future__ import unicode_literals, division
+
+import hashlib
+import math
+import struct
+
+from django.utils.encoding import force_bytes
+
+
+class BloomFilter(object):
+    """
+    Compact set membership test. ``key in bloom_filter`` never gives a false
+    negative, and a false positive with roughly ``false_positive_rate``
+    probability once ``capacity`` keys were added.
+    """
+
+    def __init__(self, capacity, false_positive_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def get_positions(self, key):
+        # Double hashing: k positions out of the two halves of one digest.
+        first, second = struct.unpack('>QQ', hashlib.md5(force_bytes(key)).digest())
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self.get_positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        for position in self.get_positions(key):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def false_positive_rate(self):
+        """
+        Expected false positive rate for the keys added so far.
+        """
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
@@ -0,0 +1,31 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core import checks
+
+# Backends which keep entries in the process storing them.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+def check_redirects_cache(app_configs=None, **kwargs):
+    """
+    Warns when the rules version can not reach other processes, they would
+    keep answering from the rules they loaded first.
+    """
+    alias = getattr(settings, 'ALDRYN_REDIRECTS_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [checks.Warning(
+        'The cache {!r} is not shared between processes, they never see rule changes made by others.'.format(alias),
+        hint=(
+            'Set ALDRYN_REDIRECTS_CACHE to a cache shared by all processes, such as Memcached or Redis, '
+            'or silence this check when a single process serves requests.'
+        ),
+        id='aldryn_redirects.W001',
+    )]
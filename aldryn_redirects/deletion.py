@@ -0,0 +1,103 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+from django.db.models.sql.subqueries import DeleteQuery
+
+from parler import appsettings as parler_appsettings
+from parler.cache import get_translation_cache_key
+
+from .signals import invalidate_redirects
+from .utils import get_chunks
+
+
+def get_dependent_fields(model):
+    """
+    Returns the foreign keys pointing to model: translations, query params
+    and the rows of its many-to-many relations. All of them cascade.
+    """
+    return [
+        relation.field
+        for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete and (relation.one_to_many or relation.one_to_one)
+    ]
+
+
+def delete_batch(field, values, using):
+    """
+    Deletes the rows whose field is in values, with set-based queries.
+    """
+    model = field.model
+
+    # Like DeleteQuery.delete_batch(), which only supports primary keys.
+    for chunk in get_chunks(values, GET_ITERATOR_CHUNK_SIZE):
+        query = DeleteQuery(model)
+        query.add_q(Q(**{'{}__in'.format(field.attname): chunk}))
+        query.do_query(model._meta.db_table, query.where, using=using)
+
+
+def get_translation_cache_keys(model, pks):
+    """
+    Returns the keys parler may have cached the translations of the rows
+    of model under, in any language.
+    """
+    if not parler_appsettings.PARLER_ENABLE_CACHING or not hasattr(model, '_parler_meta'):
+        return []
+
+    return [
+        get_translation_cache_key(translations_model, pk, language_code)
+        for translations_model in model._parler_meta.get_all_models()
+        for pk in pks
+        for language_code, language_name in settings.LANGUAGES
+    ]
+
+
+def get_pk_chunks(queryset, chunk_size):
+    """
+    Yields the primary keys of queryset in ascending chunks, each one read
+    after the previous one was deleted.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        # Filters across relations may repeat a row.
+        pks = sorted(set(chunk.values_list('pk', flat=True)[:chunk_size]))
+
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def delete_in_chunks(queryset, chunk_size=None):
+    """
+    Deletes the rows of queryset, and the rows depending on them, in chunks
+    of ``chunk_size`` (defaults to ``ALDRYN_REDIRECTS_DELETE_CHUNK_SIZE``)
+    committed one by one. Returns the number of rows deleted.
+
+    Unlike ``QuerySet.delete()`` no object is loaded and no delete signal is
+    sent per row, the rules are invalidated once at the end.
+    """
+    model = queryset.model
+    chunk_size = chunk_size or getattr(settings, 'ALDRYN_REDIRECTS_DELETE_CHUNK_SIZE', 1000)
+    using = router.db_for_write(model)
+    fields = get_dependent_fields(model)
+    deleted = 0
+
+    for pks in get_pk_chunks(queryset, chunk_size):
+        with transaction.atomic(using=using):
+            for field in fields:
+                delete_batch(field, pks, using)
+            delete_batch(model._meta.pk, pks, using)
+        # No delete signal clears them, like for bulk imports.
+        cache.delete_many(get_translation_cache_keys(model, pks))
+        deleted += len(pks)
+
+    if deleted:
+        invalidate_redirects(sender=model)
+    return deleted
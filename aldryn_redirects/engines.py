@@ -0,0 +1,814 @@
+from __future__ import unicode_literals, division
+
+import copy
+import hashlib
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import namedtuple
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.http import HttpRequest
+from django.utils.encoding import force_bytes
+from django.utils.module_loading import import_string
+from django.utils.translation import get_language, get_language_from_request
+
+from parler import appsettings
+from parler.utils import get_language_settings
+
+from six.moves.urllib.parse import unquote, urlparse
+
+from .bloom import BloomFilter
+from .metrics import get_sink, timed
+from .models import PrefixRedirect, Redirect, RedirectTranslation, RegexRedirect, StaticRedirect
+from .patterns import RegexRuleSet
+from .trie import PrefixTrie
+from .utils import (
+    append_path_remainder, build_absolute_url, get_query_params_dict, get_query_params_hash, get_redirect_key,
+)
+
+try:
+    from functools import lru_cache
+except ImportError:  # COMPAT: Python 2
+    from django.utils.lru_cache import lru_cache
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = 'aldryn_redirects.engines.DatabaseEngine'
+VERSION_KEY = 'aldryn_redirects:version'
+
+# ``url`` is empty for rules which have no target (answered with a 410).
+Match = namedtuple('Match', ['kind', 'pk', 'url'])
+# Returned by ``resolve_nowait()`` when a request can not be resolved from memory.
+UNRESOLVED = object()
+
+
+def get_redirects_cache():
+    return caches[getattr(settings, 'ALDRYN_REDIRECTS_CACHE', 'default')]
+
+
+def get_rules_version():
+    """
+    Returns a token which changes whenever redirect rules change.
+    """
+    cache = get_redirects_cache()
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        # Never fall back to a token which might have been used before.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_rules_version():
+    version = uuid.uuid4().hex
+    get_redirects_cache().set(VERSION_KEY, version, None)
+    return version
+
+
+def get_full_domain(request, domain):
+    return '{}://{}'.format(request.scheme, domain)
+
+
+def get_redirect_keys(request):
+    """
+    Returns the keys a Redirect.old_path_key is matched against, most specific first.
+    """
+    path = request.path_info
+    path_with_queries = request.get_full_path()
+    paths = [path_with_queries, path]
+
+    if settings.APPEND_SLASH and path.endswith('/'):
+        path_with_queries_no_slash = path[:-1] + path_with_queries[len(path):]
+        paths += [path_with_queries_no_slash, path[:-1]]
+    return [get_redirect_key(path) for path in paths]
+
+
+def get_static_redirect_route(request):
+    path_info = request.path_info
+
+    if settings.APPEND_SLASH and path_info.endswith('/'):
+        return path_info[:-1]
+    return path_info
+
+
+def get_filter_key(path):
+    """
+    Coarse key shared by a request path and every rule it might match:
+    lower-cased, without query string and trailing slash.
+    """
+    return path.split('?', 1)[0].rstrip('/').lower()
+
+
+def get_request_language(request):
+    # The middleware usually runs before LocaleMiddleware has set LANGUAGE_CODE.
+    language_code = getattr(request, 'LANGUAGE_CODE', None)
+    return language_code or get_language_from_request(request, check_path=True)
+
+
+@lru_cache(maxsize=None)
+def get_language_choices(language_code):
+    """
+    Returns the language followed by its fallbacks, as configured for parler.
+    """
+    fallbacks = get_language_settings(language_code)['fallbacks']
+    return [language_code] + [language for language in fallbacks if language != language_code]
+
+
+def resolve_translation(translations, language_code=None):
+    """
+    Picks a value out of a ``{language_code: value}`` dict the same way
+    ``safe_translation_getter(..., any_language=True)`` does: the language,
+    its fallbacks and finally any language.
+    """
+    if not translations:
+        return None
+
+    language_code = language_code or get_language() or appsettings.PARLER_DEFAULT_LANGUAGE_CODE
+
+    for language in get_language_choices(language_code):
+        if language in translations:
+            return translations[language]
+    return next(iter(translations.values()))
+
+
+@lru_cache(maxsize=None)
+def compile_excluded_paths(patterns):
+    if not patterns:
+        return None
+
+    try:
+        # A single alternation, paths are matched in one pass whatever the number of patterns.
+        return re.compile('|'.join('(?:{})'.format(pattern) for pattern in patterns))
+    except re.error as e:
+        raise ImproperlyConfigured('Invalid ALDRYN_REDIRECTS_EXCLUDED_PATHS: {}'.format(e))
+
+
+def is_excluded_path(path):
+    """
+    Whether path matches one of the ``ALDRYN_REDIRECTS_EXCLUDED_PATHS``
+    regular expressions, which are matched at the start of the path.
+    """
+    regex = compile_excluded_paths(tuple(getattr(settings, 'ALDRYN_REDIRECTS_EXCLUDED_PATHS', ())))
+    return regex is not None and regex.match(path) is not None
+
+
+def build_regex_rules(site_id):
+    rules = (
+        RegexRedirect
+        .objects
+        .filter(sites__id__exact=site_id)
+        .order_by('pk')
+        .values_list('pk', 'pattern', 'replacement')
+    )
+    return RegexRuleSet((pattern, (pk, replacement)) for pk, pattern, replacement in rules.iterator())
+
+
+def expand_regex_target(regex_match, replacement):
+    """
+    Returns the target of a matched regex rule, or None when the groups of
+    the request would send it to another host than the replacement names.
+    """
+    url = regex_match.expand(replacement)
+    scheme, netloc = urlparse(replacement)[:2]
+
+    if not netloc:
+        # Stays on the site, '//host' would leave it. Browsers read backslashes as slashes.
+        return '/' + url.lstrip('/\\ \t\r\n')
+
+    if urlparse(url)[:2] != (scheme, netloc):
+        logger.warning('Regex redirect to %r rejected, it leaves %s.', url, netloc)
+        return None
+    return url
+
+
+def match_regex_rules(regex_rules, request, domain):
+    match = regex_rules.match(request.get_full_path())
+
+    if match:
+        (pk, replacement), regex_match = match
+        url = expand_regex_target(regex_match, replacement)
+
+        if url is not None:
+            return Match('regex', pk, build_absolute_url(url, get_full_domain(request, domain)))
+
+
+def build_prefix_rules(site_id, domain):
+    """
+    Returns a ``PrefixTrie`` of ``(pk, http outbound url, https outbound url,
+    keep_remainder)`` for the prefix redirects of a site.
+    """
+    prefix_rules = PrefixTrie()
+    rules = (
+        PrefixRedirect
+        .objects
+        .filter(sites__id__exact=site_id)
+        .order_by('pk')
+        .values_list('pk', 'inbound_prefix', 'outbound_route', 'keep_remainder')
+    )
+    for pk, inbound_prefix, outbound_route, keep_remainder in rules.iterator():
+        prefix_rules.add(inbound_prefix, (
+            pk,
+            build_absolute_url(outbound_route, 'http://{}'.format(domain)),
+            build_absolute_url(outbound_route, 'https://{}'.format(domain)),
+            keep_remainder,
+        ))
+    return prefix_rules
+
+
+def match_prefix_rules(prefix_rules, request):
+    prefix_redirect = prefix_rules.match(request.path_info)
+
+    if prefix_redirect:
+        (pk, http_url, https_url, keep_remainder), depth = prefix_redirect
+        url = https_url if request.is_secure() else http_url
+
+        if keep_remainder:
+            url = append_path_remainder(url, request.path_info, depth, request.META.get('QUERY_STRING', ''))
+        return Match('prefix', pk, url)
+
+
+def build_static_redirects(site_id, domain, **filters):
+    """
+    Returns ``{(inbound_route, query_params_hash): (pk, http outbound url,
+    https outbound url)}`` for the static redirects of a site.
+    """
+    static_redirects = {}
+    rules = (
+        StaticRedirect
+        .objects
+        .filter(sites__id__exact=site_id, **filters)
+        .order_by('pk')
+        .values_list('pk', 'inbound_route', 'query_params_hash', 'outbound_route')
+    )
+    for pk, inbound_route, query_params_hash, outbound_route in rules.iterator():
+        key = (inbound_route, query_params_hash)
+        if key not in static_redirects:
+            static_redirects[key] = (
+                pk,
+                build_absolute_url(outbound_route, 'http://{}'.format(domain)),
+                build_absolute_url(outbound_route, 'https://{}'.format(domain)),
+            )
+    return static_redirects
+
+
+def match_static_redirects(static_redirects, request):
+    route = get_static_redirect_route(request)
+    query_params_hash = get_query_params_hash(get_query_params_dict(request.get_full_path()))
+    static_redirect = static_redirects.get((route, query_params_hash))
+
+    if static_redirect:
+        pk, http_url, https_url = static_redirect
+        return Match('static', pk, https_url if request.is_secure() else http_url)
+
+
+def get_target_request(request, url, domain):
+    """
+    Returns a copy of request for url, as the client would request it after
+    being redirected, or None when url points to another domain.
+    """
+    parsed_url = urlparse(url)
+
+    if parsed_url.netloc and parsed_url.netloc != domain or not parsed_url.path.startswith('/'):
+        return None
+
+    path = unquote(parsed_url.path)
+    target = copy.copy(request)
+    target.path = target.path_info = path
+    target.META = dict(request.META, PATH_INFO=path, QUERY_STRING=parsed_url.query)
+    return target
+
+
+def get_redirect_chain(lookup, request, match, domain, max_depth=None):
+    """
+    Follows match from rule to rule with lookup, for at most max_depth hops
+    (defaults to ``ALDRYN_REDIRECTS_MAX_CHAIN_DEPTH``). Returns the matches
+    met, and whether the last one closes a loop.
+    """
+    if max_depth is None:
+        max_depth = getattr(settings, 'ALDRYN_REDIRECTS_MAX_CHAIN_DEPTH', 5)
+
+    matches = [match]
+    seen = {match[:2]}
+
+    for _ in range(max_depth):
+        target = get_target_request(request, matches[-1].url, domain)
+        next_match = target and lookup(target)
+
+        # Rules without target answer with a 410, the chain ends before them.
+        if not next_match or not next_match.url:
+            break
+
+        matches.append(next_match)
+        if next_match[:2] in seen:
+            return matches, True
+        seen.add(next_match[:2])
+    return matches, False
+
+
+def find_redirect_loops(site_id, max_depth=100):
+    """
+    Returns the loops between the static and multilanguage redirects of a
+    site, as lists of matches.
+    """
+    table = RedirectTable.build(site_id)
+    starts = [
+        (Match('static', pk, http_url), None)
+        for pk, http_url, https_url in table.static_redirects.values()
+    ]
+    starts += [
+        (Match('redirect', pk, new_path), language_code)
+        for pk, translations in table.redirects.values()
+        for language_code, new_path in translations.items()
+        if new_path
+    ]
+    loops = {}
+
+    for match, language_code in starts:
+        request = HttpRequest()
+        request.LANGUAGE_CODE = language_code or settings.LANGUAGE_CODE
+        matches, looped = get_redirect_chain(table.lookup, request, match, table.domain, max_depth)
+
+        if looped:
+            rules = [m[:2] for m in matches]
+            start = rules.index(rules[-1])
+            loops.setdefault(frozenset(rules[start:]), matches[start:-1])
+    return list(loops.values())
+
+
+class BaseEngine(object):
+    """
+    Resolves a request into a ``Match`` or ``None``.
+    """
+    # Whether resolve() follows redirect chains, each hop costs a lookup.
+    follow_chains = False
+
+    def lookup(self, request):
+        raise NotImplementedError
+
+    def resolve(self, request):
+        """
+        Like lookup(), with the url of the match replaced by the end of the
+        redirect chain it starts, so clients take a single hop.
+        """
+        match = self.lookup(request)
+
+        if not self.follow_chains or not match or not match.url:
+            return match
+        return self.follow_chain(self.lookup, request, match, Site.objects.get_current().domain)
+
+    def resolve_nowait(self, request):
+        """
+        Like resolve(), without queries or cache requests. Returns
+        ``UNRESOLVED`` when the request can not be resolved from memory.
+        """
+        return UNRESOLVED
+
+    def follow_chain(self, lookup, request, match, domain):
+        matches, looped = get_redirect_chain(lookup, request, match, domain)
+
+        if looped:
+            logger.warning('Redirect loop: %s.', ' --> '.join('{}:{}'.format(*m[:2]) for m in matches))
+            return match
+        return match._replace(url=matches[-1].url)
+
+    def invalidate(self):
+        """
+        Called whenever redirect rules change.
+        """
+        pass
+
+
+class DatabaseEngine(BaseEngine):
+
+    def __init__(self):
+        # Compiling the regex rules on every request would cost more than a query.
+        self.pattern_engine = PatternEngine()
+
+    def lookup(self, request):
+        with timed('static_query_seconds'):
+            static_redirect = StaticRedirect.objects.get_for_request(request)
+
+        if static_redirect:
+            # get_current() is served from the sites cache.
+            full_domain = get_full_domain(request, Site.objects.get_current().domain)
+            return Match('static', static_redirect.pk, static_redirect.get_outbound_url(full_domain))
+
+        keys = get_redirect_keys(request)
+        # Rules are fetched together with all their translations, in one query.
+        rows = (
+            Redirect
+            .objects
+            .filter(site__id__exact=settings.SITE_ID, old_path_key__in=keys)
+            .order_by('pk', 'translations__pk')
+            .values_list('pk', 'old_path_key', 'translations__language_code', 'translations__new_path')
+        )
+        with timed('redirect_query_seconds'):
+            rows = list(rows)
+        redirects = {}
+
+        for pk, old_path_key, language_code, new_path in rows:
+            redirect_pk, translations = redirects.setdefault(old_path_key, (pk, {}))
+            if redirect_pk == pk and language_code is not None:
+                translations[language_code] = new_path
+
+        for key in keys:
+            if key in redirects:
+                pk, translations = redirects[key]
+                return Match('redirect', pk, resolve_translation(translations, get_request_language(request)))
+
+        return self.pattern_engine.lookup(request)
+
+    def invalidate(self):
+        self.pattern_engine.invalidate()
+
+
+class RedirectTable(object):
+    """
+    Immutable snapshot of all redirect rules of a site.
+    """
+
+    def __init__(self, domain, static_redirects, redirects, regex_redirects, prefix_redirects):
+        self.domain = domain
+        # {(inbound_route, query_params_hash): (pk, http outbound url, https outbound url)}
+        self.static_redirects = static_redirects
+        # {old_path_key: (pk, {language_code: new_path})}
+        self.redirects = redirects
+        # RegexRuleSet of (pk, replacement)
+        self.regex_redirects = regex_redirects
+        # inbound_prefix -> (pk, http outbound url, https outbound url, keep_remainder)
+        self.prefix_redirects = prefix_redirects
+
+    @classmethod
+    def build(cls, site_id):
+        domain = Site.objects.get(id=site_id).domain
+        static_redirects = build_static_redirects(site_id, domain)
+
+        translations = {}
+        new_paths = (
+            RedirectTranslation
+            .objects
+            .filter(master__site__id__exact=site_id)
+            .order_by('pk')
+            .values_list('master_id', 'language_code', 'new_path')
+        )
+        for master_id, language_code, new_path in new_paths.iterator():
+            translations.setdefault(master_id, {})[language_code] = new_path
+
+        redirects = {}
+        rules = (
+            Redirect
+            .objects
+            .filter(site__id__exact=site_id)
+            .order_by('pk')
+            .values_list('pk', 'old_path_key')
+        )
+        for pk, old_path_key in rules.iterator():
+            redirects.setdefault(old_path_key, (pk, translations.get(pk, {})))
+
+        return cls(
+            domain, static_redirects, redirects, build_regex_rules(site_id), build_prefix_rules(site_id, domain),
+        )
+
+    def lookup(self, request):
+        match = match_static_redirects(self.static_redirects, request)
+        if match:
+            return match
+
+        for key in get_redirect_keys(request):
+            redirect = self.redirects.get(key)
+            if redirect:
+                pk, translations = redirect
+                return Match('redirect', pk, resolve_translation(translations, get_request_language(request)))
+
+        match = match_regex_rules(self.regex_redirects, request, self.domain)
+        if match:
+            return match
+        return match_prefix_rules(self.prefix_redirects, request)
+
+
+class SnapshotEngine(BaseEngine):
+    """
+    Base for engines answering lookups from an in-process snapshot per site.
+
+    Snapshots are built lazily and replaced as a whole, so concurrent lookups
+    always see a complete one. Changes made by other processes are picked
+    up through the rules version kept in the cache, which is checked at most
+    every ``ALDRYN_REDIRECTS_REFRESH_INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._version = None
+        self._checked_at = 0
+
+    def build_snapshot(self, site_id):
+        raise NotImplementedError
+
+    def is_check_due(self, now):
+        return now - self._checked_at >= getattr(settings, 'ALDRYN_REDIRECTS_REFRESH_INTERVAL', 5)
+
+    def check_version(self):
+        now = time.time()
+        if not self.is_check_due(now):
+            return
+        self._checked_at = now
+
+        version = get_rules_version()
+        if version != self._version:
+            self._version = version
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshots = {}
+
+    def get_snapshot(self, site_id):
+        self.check_version()
+        snapshot = self._snapshots.get(site_id)
+
+        if snapshot is None:
+            generation = self._generation
+            snapshot = self.build_snapshot(site_id)
+
+            with self._lock:
+                # Rules changed while building, the snapshot might be incomplete.
+                if generation == self._generation:
+                    snapshots = dict(self._snapshots)
+                    snapshots[site_id] = snapshot
+                    self._snapshots = snapshots
+        return snapshot
+
+    def get_loaded_snapshot(self, site_id):
+        """
+        Returns the snapshot of site_id when it is built and its version
+        needs no check, None otherwise.
+        """
+        if self.is_check_due(time.time()):
+            return None
+        return self._snapshots.get(site_id)
+
+    def invalidate(self):
+        self._version = bump_rules_version()
+        self.clear()
+
+
+class PatternEngine(SnapshotEngine):
+    """
+    Matches the regex rules, then the prefix rules, of a site, both loaded
+    once per rules version.
+    """
+
+    def build_snapshot(self, site_id):
+        domain = Site.objects.get(id=site_id).domain
+        return domain, build_regex_rules(site_id), build_prefix_rules(site_id, domain)
+
+    def lookup(self, request):
+        domain, regex_rules, prefix_rules = self.get_snapshot(settings.SITE_ID)
+        return match_regex_rules(regex_rules, request, domain) or match_prefix_rules(prefix_rules, request)
+
+
+class EagerEngine(SnapshotEngine):
+    """
+    Matches the eager static redirects of a site, which are looked up before
+    the view is called when ``ALDRYN_REDIRECTS_NOT_FOUND_ONLY`` is set.
+    """
+
+    def build_snapshot(self, site_id):
+        domain = Site.objects.get(id=site_id).domain
+        return build_static_redirects(site_id, domain, eager=True)
+
+    def lookup(self, request):
+        return match_static_redirects(self.get_snapshot(settings.SITE_ID), request)
+
+    def resolve_nowait(self, request):
+        static_redirects = self.get_loaded_snapshot(settings.SITE_ID)
+
+        if static_redirects is None:
+            return UNRESOLVED
+        return match_static_redirects(static_redirects, request)
+
+
+class TableEngine(SnapshotEngine):
+    """
+    Answers lookups from an in-process ``RedirectTable``, without queries.
+    """
+    follow_chains = True
+
+    def build_snapshot(self, site_id):
+        return RedirectTable.build(site_id)
+
+    def lookup(self, request):
+        return self.get_snapshot(settings.SITE_ID).lookup(request)
+
+    def resolve_nowait(self, request):
+        table = self.get_loaded_snapshot(settings.SITE_ID)
+
+        if table is None:
+            return UNRESOLVED
+
+        match = table.lookup(request)
+        if not match or not match.url:
+            return match
+        return self.follow_chain(table.lookup, request, match, table.domain)
+
+
+class CachedEngine(BaseEngine):
+    """
+    Caches the outcome of ``engine_class`` lookups, misses included, in
+    ``ALDRYN_REDIRECTS_CACHE`` for ``ALDRYN_REDIRECTS_CACHE_TIMEOUT`` seconds.
+
+    Entries store the rules version they were looked up with, so changing
+    any rule invalidates all of them at once.
+    """
+    engine_class = DatabaseEngine
+    follow_chains = True
+
+    def __init__(self):
+        self.engine = self.engine_class()
+
+    def get_cache_key(self, request):
+        # The raw query string is used because Redirect.old_path may contain
+        # a literal query string, which is matched as is.
+        path = '{}?{}'.format(request.path_info, request.META.get('QUERY_STRING', ''))
+        return 'aldryn_redirects:lookup:{}:{}:{}:{}'.format(
+            settings.SITE_ID,
+            request.scheme,
+            get_request_language(request),
+            hashlib.md5(force_bytes(path)).hexdigest(),
+        )
+
+    def lookup(self, request):
+        cache = get_redirects_cache()
+        key = self.get_cache_key(request)
+        # The rules version and the entry are read in a single round trip.
+        values = cache.get_many([VERSION_KEY, key])
+        version = values.get(VERSION_KEY) or get_rules_version()
+        entry_version, match = values.get(key, (None, None))
+
+        if entry_version == version:
+            get_sink().increment('cache.hits')
+            return match
+
+        get_sink().increment('cache.misses')
+        match = self.engine.lookup(request)
+        timeout = getattr(settings, 'ALDRYN_REDIRECTS_CACHE_TIMEOUT', 3600)
+        # Misses are cached as well.
+        cache.set(key, (version, match), timeout)
+        return match
+
+    def invalidate(self):
+        bump_rules_version()
+        self.engine.invalidate()
+
+
+class FilteredEngine(SnapshotEngine):
+    """
+    Skips ``engine_class`` for requests which can not match any rule,
+    according to a Bloom filter over the inbound paths of the site, a trie
+    of its prefix rules and its regex rules.
+
+    The filter is sized for ``ALDRYN_REDIRECTS_FILTER_FALSE_POSITIVE_RATE``
+    (defaults to ``0.01``); ``get_stats()`` reports how it performs.
+    """
+    engine_class = CachedEngine
+    follow_chains = True
+
+    def __init__(self):
+        super(FilteredEngine, self).__init__()
+        self.engine = self.engine_class()
+        # Not synchronized, an occasional lost increment is fine for reporting.
+        self.stats = {'rejected': 0, 'passed': 0, 'false_positives': 0}
+
+    def build_snapshot(self, site_id):
+        redirects = (
+            Redirect
+            .objects
+            .filter(site__id__exact=site_id)
+            .values_list('old_path_key', flat=True)
+        )
+        static_redirects = (
+            StaticRedirect
+            .objects
+            .filter(sites__id__exact=site_id)
+            .values_list('inbound_route', flat=True)
+        )
+        bloom_filter = BloomFilter(
+            capacity=redirects.count() + static_redirects.count(),
+            false_positive_rate=getattr(settings, 'ALDRYN_REDIRECTS_FILTER_FALSE_POSITIVE_RATE', 0.01),
+        )
+
+        for path in chain(redirects.iterator(), static_redirects.iterator()):
+            bloom_filter.add(get_filter_key(path))
+
+        # Prefix rules are few, they are matched exactly.
+        prefixes = PrefixTrie()
+        inbound_prefixes = (
+            PrefixRedirect
+            .objects
+            .filter(sites__id__exact=site_id)
+            .values_list('inbound_prefix', flat=True)
+        )
+        for inbound_prefix in inbound_prefixes.iterator():
+            prefixes.add(inbound_prefix, True)
+
+        logger.info(
+            'Built redirects filter for site %s: %s rules, %s bytes, estimated false positive rate %.4f, '
+            '%s prefix rules.',
+            site_id, bloom_filter.count, len(bloom_filter.bits), bloom_filter.false_positive_rate, len(prefixes),
+        )
+        return bloom_filter, prefixes, build_regex_rules(site_id)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        bloom_filter = self.get_snapshot(settings.SITE_ID)[0]
+        stats['estimated_false_positive_rate'] = bloom_filter.false_positive_rate
+
+        if stats['passed']:
+            stats['observed_false_positive_rate'] = stats['false_positives'] / stats['passed']
+        else:
+            stats['observed_false_positive_rate'] = 0.0
+        return stats
+
+    def may_match(self, snapshot, request):
+        bloom_filter, prefixes, regex_rules = snapshot
+        path = request.path_info
+        # Static redirects match the decoded path, redirects the escaped one as well.
+        full_path = request.get_full_path()
+        return (
+            get_filter_key(path) in bloom_filter
+            or get_filter_key(full_path) in bloom_filter
+            or prefixes.match(path)
+            or regex_rules.match(full_path)
+        )
+
+    def lookup(self, request):
+        if not self.may_match(self.get_snapshot(settings.SITE_ID), request):
+            self.stats['rejected'] += 1
+            return
+
+        self.stats['passed'] += 1
+        match = self.engine.lookup(request)
+
+        if match is None:
+            self.stats['false_positives'] += 1
+        return match
+
+    def resolve_nowait(self, request):
+        # Most requests are rejected by the filter, only those need no lookup.
+        snapshot = self.get_loaded_snapshot(settings.SITE_ID)
+
+        if snapshot is None or self.may_match(snapshot, request):
+            return UNRESOLVED
+
+        self.stats['rejected'] += 1
+        return None
+
+    def invalidate(self):
+        self.engine.invalidate()
+        self.clear()
+
+
+_engine = None
+_eager_engine = None
+
+
+def get_engine():
+    global _engine
+
+    if _engine is None:
+        _engine = import_string(getattr(settings, 'ALDRYN_REDIRECTS_ENGINE', DEFAULT_ENGINE))()
+    return _engine
+
+
+def get_eager_engine():
+    global _eager_engine
+
+    if _eager_engine is None:
+        _eager_engine = EagerEngine()
+    return _eager_engine
+
+
+def reset_engine(setting, **kwargs):
+    global _engine, _eager_engine
+
+    if setting.startswith('ALDRYN_REDIRECTS_'):
+        _engine = None
+        _eager_engine = None
+    elif setting.startswith('PARLER_') or setting == 'LANGUAGES':
+        get_language_choices.cache_clear()
+
+
+setting_changed.connect(reset_engine)
@@ -0,0 +1,72 @@
+from __future__ import unicode_literals
+
+from tablib import Dataset
+
+from .utils import add_query_params_to_url
+
+
+class RedirectExporter(object):
+    headers = ['Domain', 'Old', 'New', 'Language']
+    chunk_size = 2000
+
+    def prepare_queryset(self, queryset):
+        return queryset.select_related('site').prefetch_related('translations')
+
+    def get_chunks(self, queryset):
+        """
+        Yields the objects of queryset in lists of chunk_size, paginating on the
+        primary key so every chunk costs the same few queries.
+        """
+        queryset = self.prepare_queryset(queryset.order_by('pk'))
+        chunk = list(queryset[:self.chunk_size])
+
+        while chunk:
+            yield chunk
+            chunk = list(queryset.filter(pk__gt=chunk[-1].pk)[:self.chunk_size])
+
+    def get_rows(self, redirect):
+        for translation in redirect.translations.all():
+            yield [
+                redirect.site.domain,
+                redirect.old_path,
+                translation.new_path,
+                translation.language_code,
+            ]
+
+    def get_datasets(self, queryset):
+        """
+        Yields a headerless dataset of rows per chunk of queryset.
+        """
+        for chunk in self.get_chunks(queryset):
+            dataset = Dataset()
+            for obj in chunk:
+                dataset.extend(self.get_rows(obj))
+            yield dataset
+
+    def export_to_csv(self, queryset):
+        """
+        Yields the csv export of queryset piece by piece, to be streamed.
+        """
+        yield Dataset(headers=self.headers).csv
+
+        for dataset in self.get_datasets(queryset):
+            yield dataset.csv
+
+
+class StaticRedirectExporter(RedirectExporter):
+    headers = ['domain', 'inbound_route', 'outbound_route']
+
+    def prepare_queryset(self, queryset):
+        return queryset.prefetch_related('sites', 'query_params')
+
+    def get_rows(self, redirect):
+        # Built from the prefetched params, get_full_inbound_route() would query them again.
+        query_params = {param.key: param.value for param in redirect.query_params.all()}
+        inbound_route = add_query_params_to_url(redirect.inbound_route, query_params)
+
+        for site in redirect.sites.all():
+            yield [
+                site.domain,
+                inbound_route,
+                redirect.outbound_route,
+            ]
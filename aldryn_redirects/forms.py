@@ -1,12 +1,14 @@
 from __future__ import unicode_literals
 
-from tablib import Dataset
+import csv
+from collections import Counter
 
 from django import forms
-from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
 
 from .importers import RedirectImporter, StaticRedirectImporter
+from .models import ImportJob
+from .utils import get_chunks, read_import_rows
 
 
 class RedirectsImportForm(forms.Form):
@@ -18,25 +20,46 @@ class RedirectsImportForm(forms.Form):
         super(RedirectsImportForm, self).__init__(*args, **kwargs)
         self.importer = self.importer_class()
 
-    def clean_csv_file(self, *args, **kwargs):
+    def get_rows(self):
         csv_file = self.cleaned_data['csv_file']
+        # Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are read from disk.
         csv_file.seek(0)
-        dataset = Dataset().load(csv_file.read().decode('utf-8'), format='csv')
+        return read_import_rows(csv_file)
+
+    def clean_csv_file(self, *args, **kwargs):
+        csv_file = self.cleaned_data['csv_file']
+
+        # Rows are streamed, only their keys are kept to find duplicates.
+        try:
+            errors = self.importer.validate_dataset(self.get_rows())
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise forms.ValidationError(_('Invalid csv file: {}').format(e))
 
-        for idx, row in enumerate(dataset, start=2):
-            try:
-                self.importer.validate_row(row)
-            except ValidationError as e:
-                raise forms.ValidationError('Line {}: {}'.format(idx, '\n'.join(e.messages)))
+        if errors:
+            raise forms.ValidationError([
+                'Line {}: {}'.format(line, '\n'.join(messages))
+                for line, messages in errors.items()
+            ])
 
         return csv_file
 
     def do_import(self):
-        csv_file = self.cleaned_data['csv_file']
-        csv_file.seek(0)
-        dataset = Dataset().load(csv_file.read().decode('utf-8'), format='csv')
-        self.importer.import_from_dataset(dataset)
+        """
+        Imports the file again chunk by chunk, like import jobs do.
+        """
+        result = Counter(created=0, updated=0, unchanged=0)
+
+        for rows in get_chunks(self.get_rows(), self.importer.chunk_size):
+            result.update(self.importer.import_from_dataset(rows))
+        return dict(result)
 
 
 class StaticRedirectsImportForm(RedirectsImportForm):
     importer_class = StaticRedirectImporter
+
+
+class ImportJobForm(forms.ModelForm):
+
+    class Meta:
+        model = ImportJob
+        fields = ['csv_file']
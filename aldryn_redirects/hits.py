@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Redirect, StaticRedirect
+from .utils import get_chunks
+
+
+logger = logging.getLogger(__name__)
+
+
+class HitCounter(object):
+    """
+    Aggregates the hits of rules in process and writes them every
+    ``ALDRYN_REDIRECTS_HIT_FLUSH_INTERVAL`` seconds, in a few bulk updates.
+    """
+    models = {
+        'static': StaticRedirect,
+        'redirect': Redirect,
+    }
+    chunk_size = 1000
+
+    def __init__(self):
+        # {(kind, pk): hits}
+        self._hits = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flushed_at = time.time()
+
+    def record(self, match, flush=True):
+        """
+        Records a hit of match, and writes all hits when they are due and
+        flush is true.
+        """
+        if match.kind not in self.models:
+            return
+
+        with self._lock:
+            self._hits[match[:2]] += 1
+
+        if flush and self.is_flush_due():
+            self.flush()
+
+    def is_flush_due(self):
+        interval = getattr(settings, 'ALDRYN_REDIRECTS_HIT_FLUSH_INTERVAL', 60)
+        return time.time() - self._flushed_at >= interval
+
+    def flush(self):
+        """
+        Adds the hits recorded so far to the rules, with an update per kind,
+        number of hits and chunk of rules. Returns the number of rules updated.
+        """
+        with self._lock:
+            hits, self._hits = self._hits, defaultdict(int)
+            self._flushed_at = time.time()
+
+        # Rules hit equally often share a single update; most rules are hit a few times only.
+        pks = defaultdict(list)
+        for (kind, pk), count in hits.items():
+            pks[kind, count].append(pk)
+
+        # Off by at most the flush interval.
+        now = timezone.now()
+        updated = 0
+
+        try:
+            for (kind, count), kind_pks in pks.items():
+                for chunk in get_chunks(kind_pks, self.chunk_size):
+                    updated += self.models[kind].objects.filter(pk__in=chunk).update(
+                        hit_count=F('hit_count') + count,
+                        last_hit_at=now,
+                    )
+        except Exception:
+            # Hits are statistics, losing some must not break the request.
+            logger.exception('Could not write the hits of %s redirects.', len(hits))
+        return updated
+
+
+hit_counter = HitCounter()
@@ -1,11 +1,24 @@
-from collections import defaultdict
+import multiprocessing
+from collections import Counter, OrderedDict, defaultdict
+from itertools import chain
 
+import django
+from django.apps import apps
 from django.contrib.sites.models import Site
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils.encoding import force_text
+from django.utils.module_loading import import_string
 from django.utils.translation import ugettext_lazy as _
 
-from .models import Redirect, StaticRedirect
-from .utils import get_query_params_dict, remove_query_params
+from parler import appsettings as parler_appsettings
+from parler.cache import get_translation_cache_key
+
+from .models import Redirect, RedirectTranslation, StaticRedirect, StaticRedirectInboundRouteQueryParam
+from .signals import invalidate_redirects
+from .utils import get_chunks, get_query_params_dict, get_query_params_hash, get_redirect_key, remove_query_params
 
 
 class FlattenErrorMixin(object):
@@ -19,16 +32,79 @@ class FlattenErrorMixin(object):
         return '\n'.join(result)
 
 
-class RedirectImporter(FlattenErrorMixin, object):
-
-    def __init__(self):
-        self.sites_per_domain = {site.domain: site for site in Site.objects.all()}
+class ValidateDatasetMixin(object):
+
+    def get_duplicates(self, keys):
+        """
+        Returns ``{key: pk}`` for the given row keys which clash with an existing rule.
+        """
+        return {}
+
+    def get_duplicate_message(self, pk):
+        raise NotImplementedError
+
+    def clean_rows(self, numbered_rows):
+        """
+        Yields ``(line, key, messages)`` for the given ``(line, row)`` pairs,
+        with either the key of the valid row or the error messages.
+        """
+        for line, row in numbered_rows:
+            try:
+                yield line, self.clean_row(row), None
+            except ValidationError as e:
+                yield line, None, [force_text(message) for message in e.messages]
+
+    def validate_dataset(self, dataset, start=2, pool=None):
+        """
+        Validates every row, duplicates within the dataset and against
+        existing rules included, with a few queries for the whole dataset.
+        Rows are cleaned by the workers of pool when given, see
+        ``create_validation_pool()``.
+        Returns a ``{line: [messages]}`` dict of all errors found.
+        """
+        errors = {}
+        lines_per_key = OrderedDict()
+        numbered_rows = enumerate(dataset, start=start)
+
+        if pool is None:
+            cleaned_rows = self.clean_rows(numbered_rows)
+        else:
+            chunks = pool.imap(clean_rows_chunk, get_chunks(numbered_rows, self.chunk_size))
+            cleaned_rows = chain.from_iterable(chunks)
+
+        for line, key, messages in cleaned_rows:
+            if messages:
+                errors[line] = messages
+            elif key in lines_per_key:
+                errors[line] = [_('Row duplicated with line {}.').format(lines_per_key[key])]
+            else:
+                lines_per_key[key] = line
+
+        for keys in get_chunks(lines_per_key.keys(), self.chunk_size):
+            for key, pk in self.get_duplicates(keys).items():
+                errors[lines_per_key[key]] = [self.get_duplicate_message(pk)]
+        return OrderedDict(sorted(errors.items()))
+
+
+class RedirectImporter(ValidateDatasetMixin, FlattenErrorMixin, object):
+    chunk_size = 1000
+
+    def __init__(self, chunk_size=None, sites=None):
+        if sites is None:
+            sites = Site.objects.all()
+        self.sites_per_domain = {site.domain: site for site in sites}
+
+        if chunk_size:
+            self.chunk_size = chunk_size
 
     def get_existing_redirects(self, site, paths):
+        """
+        Returns the redirects matching the given paths, keyed by their old_path_key.
+        """
         redirects = (
             Redirect
             .objects
-            .filter(site=site, old_path__in=paths)
+            .filter(site=site, old_path_key__in=[get_redirect_key(path) for path in paths])
             .prefetch_related('translations')
         )
         existing_redirects = defaultdict(dict)
@@ -36,38 +112,103 @@ class RedirectImporter(FlattenErrorMixin, object):
         for redirect in redirects:
             translations = redirect.translations.all()
             redirect._languages = [trans.language_code for trans in translations]
-            existing_redirects[redirect.old_path] = redirect
+            existing_redirects[redirect.old_path_key] = redirect
         return existing_redirects
 
     def import_from_dataset(self, dataset):
+        """
+        Creates missing redirects and translations and updates changed
+        translations, committing every chunk_size paths.
+        Returns how many translations were created, updated and left unchanged.
+        """
         imported_redirects = defaultdict(lambda: defaultdict(dict))
+        result = Counter(created=0, updated=0, unchanged=0)
 
         for row in dataset:
             domain, old_path, new_path, language = row[:4]
             imported_redirects[domain][old_path][language] = new_path
 
         sites = Site.objects.filter(domain__in=imported_redirects)
-        create_redirect = Redirect.objects.create
 
         for site in sites.iterator():
             _redirects = imported_redirects[site.domain]
-            existing_redirects = self.get_existing_redirects(site, list(_redirects.keys()))
-
-            for path in _redirects:
-                if path not in existing_redirects:
-                    # creates redirect master object
-                    redirect = create_redirect(site=site, old_path=path)
-                    redirect._languages = []
-                    existing_redirects[path] = redirect
+
+            for paths in get_chunks(_redirects.keys(), self.chunk_size):
+                chunk = OrderedDict((path, _redirects[path]) for path in paths)
+                with transaction.atomic():
+                    result.update(self.import_chunk(site, chunk))
+
+        # Bulk queries send no signals.
+        invalidate_redirects(sender=Redirect)
+        return dict(result)
+
+    def import_chunk(self, site, chunk):
+        """
+        Imports a ``{old_path: {language_code: new_path}}`` dict in bulk queries.
+        """
+        result = Counter()
+        existing_redirects = self.get_existing_redirects(site, list(chunk.keys()))
+        new_redirects = OrderedDict()
+
+        for path in chunk:
+            key = get_redirect_key(path)
+            if key not in existing_redirects and key not in new_redirects:
+                new_redirects[key] = Redirect(site=site, old_path=path, old_path_key=key)
+
+        if new_redirects:
+            # bulk_create() does not set primary keys on every backend, fetch them back.
+            Redirect.objects.bulk_create(new_redirects.values())
+            existing_redirects.update(self.get_existing_redirects(site, list(new_redirects.keys())))
+
+        translations_per_redirect = {}
+        new_translations = []
+        changed_translations = {}
+
+        for path, new_paths in chunk.items():
+            redirect = existing_redirects[get_redirect_key(path)]
+
+            if redirect.pk not in translations_per_redirect:
+                translations_per_redirect[redirect.pk] = {
+                    translation.language_code: translation for translation in redirect.translations.all()
+                }
+            translations = translations_per_redirect[redirect.pk]
+
+            for language, new_path in new_paths.items():
+                translation = translations.get(language)
+
+                if translation is None:
+                    translation = RedirectTranslation(master=redirect, language_code=language, new_path=new_path)
+                    translations[language] = translation
+                    new_translations.append(translation)
+                    result['created'] += 1
+                elif translation.new_path == new_path:
+                    result['unchanged'] += 1
+                elif translation.pk is None:
+                    translation.new_path = new_path
                 else:
-                    redirect = existing_redirects[path]
+                    translation.new_path = new_path
+                    changed_translations[translation.pk] = translation
+                    result['updated'] += 1
 
-                for language, new_path in _redirects[path].items():
-                    if language not in redirect._languages:
-                        redirect._languages.append(language)
-                        redirect.translations.create(language_code=language, new_path=new_path)
+        RedirectTranslation.objects.bulk_create(new_translations)
 
-    def validate_row(self, row):
+        if changed_translations:
+            RedirectTranslation.objects.filter(pk__in=changed_translations.keys()).update(new_path=Case(
+                *[When(pk=pk, then=Value(translation.new_path)) for pk, translation in changed_translations.items()]
+            ))
+
+        if parler_appsettings.PARLER_ENABLE_CACHING:
+            # parler may have cached these translations, or their absence.
+            cache.delete_many([
+                get_translation_cache_key(RedirectTranslation, translation.master_id, translation.language_code)
+                for translation in chain(new_translations, changed_translations.values())
+            ])
+        return result
+
+    def clean_row(self, row):
+        """
+        Validates a row on its own and returns the key of the translation it imports.
+        """
         if len(row) < 4:
             raise ValidationError(_(
                 'malformed row. Row must contain site (required), '
@@ -81,7 +222,8 @@ class RedirectImporter(FlattenErrorMixin, object):
 
         redirect = Redirect(site=self.sites_per_domain[domain], old_path=old_path)
         try:
-            redirect.full_clean(validate_unique=False)
+            # The site is known to exist, checking it would cost a query.
+            redirect.full_clean(exclude=['site'], validate_unique=False)
         except ValidationError as e:
             raise ValidationError(self.flatten_error(e))
 
@@ -90,37 +232,149 @@ class RedirectImporter(FlattenErrorMixin, object):
             redirect_translation.full_clean(validate_unique=False)
         except ValidationError as e:
             raise ValidationError(self.flatten_error(e))
+        return domain, get_redirect_key(old_path), language
+
+    def validate_row(self, row):
+        self.clean_row(row)
 
 
-class StaticRedirectImporter(FlattenErrorMixin, object):
+class StaticRedirectImporter(ValidateDatasetMixin, FlattenErrorMixin, object):
+    chunk_size = 1000
 
-    def __init__(self):
-        self.sites_per_domain = {site.domain: site for site in Site.objects.all()}
+    def __init__(self, chunk_size=None, sites=None):
+        if sites is None:
+            sites = Site.objects.all()
+        self.sites_per_domain = {site.domain: site for site in sites}
+
+        if chunk_size:
+            self.chunk_size = chunk_size
+
+    def get_existing_redirects(self, inbound_routes):
+        """
+        Returns the redirects for the given inbound routes keyed by
+        (inbound_route, outbound_route, query_params_hash), with their site ids.
+        """
+        redirects = (
+            StaticRedirect
+            .objects
+            .filter(inbound_route__in=inbound_routes)
+            .order_by('pk')
+            .values_list('inbound_route', 'outbound_route', 'query_params_hash', 'pk')
+        )
+        existing_redirects = OrderedDict()
+
+        for inbound_route, outbound_route, query_params_hash, pk in redirects:
+            existing_redirects.setdefault((inbound_route, outbound_route, query_params_hash), pk)
+
+        site_ids = defaultdict(set)
+        sites = (
+            StaticRedirect.sites.through
+            .objects
+            .filter(staticredirect_id__in=existing_redirects.values())
+            .values_list('staticredirect_id', 'site_id')
+        )
+        for static_redirect_id, site_id in sites:
+            site_ids[static_redirect_id].add(site_id)
+        return existing_redirects, site_ids
 
     def import_from_dataset(self, dataset):
-        for row in dataset:
+        """
+        Adds the sites to matching rules and creates the missing ones,
+        committing every chunk_size rows.
+        Returns how many rules were created, got a new site or were left unchanged.
+        """
+        result = Counter(created=0, updated=0, unchanged=0)
+
+        for rows in get_chunks(dataset, self.chunk_size):
+            with transaction.atomic():
+                result.update(self.import_chunk(rows))
+
+        # Bulk queries send no signals.
+        invalidate_redirects(sender=StaticRedirect)
+        return dict(result)
+
+    def import_chunk(self, rows):
+        result = Counter()
+        imported_redirects = []
+
+        for row in rows:
             domain, inbound_route, outbound_route = row[:3]
-            site = self.sites_per_domain[domain]
-
             query_params = get_query_params_dict(inbound_route)
             if query_params:
                 inbound_route = remove_query_params(inbound_route)
 
-            existing_redirect_updated = False
-            dupe = StaticRedirect.objects.filter(inbound_route=inbound_route, outbound_route=outbound_route).first()
-            if dupe:
-                dupe_query_params = dupe.query_params.as_dict()
-                if dupe_query_params == query_params:
-                    dupe.sites.add(site)
-                    existing_redirect_updated = True
+            key = (inbound_route, outbound_route, get_query_params_hash(query_params))
+            imported_redirects.append((self.sites_per_domain[domain], key, query_params))
+
+        inbound_routes = {key[0] for site, key, query_params in imported_redirects}
+        existing_redirects, site_ids = self.get_existing_redirects(inbound_routes)
+        new_redirects = OrderedDict()
+
+        for site, key, query_params in imported_redirects:
+            if key not in existing_redirects and key not in new_redirects:
+                inbound_route, outbound_route, query_params_hash = key
+                new_redirects[key] = (
+                    StaticRedirect(
+                        inbound_route=inbound_route,
+                        outbound_route=outbound_route,
+                        query_params_hash=query_params_hash,
+                    ),
+                    query_params,
+                )
 
-            if not existing_redirect_updated:
-                redirect = StaticRedirect.objects.create(inbound_route=inbound_route, outbound_route=outbound_route)
-                redirect.sites.add(site)
-                for key, value in query_params.items():
-                    redirect.query_params.create(key=key, value=value)
+        if new_redirects:
+            # bulk_create() does not set primary keys on every backend, fetch them back.
+            StaticRedirect.objects.bulk_create(redirect for redirect, query_params in new_redirects.values())
+            existing_redirects, site_ids = self.get_existing_redirects(inbound_routes)
+            result['created'] += len(new_redirects)
+
+        new_sites = []
+        for site, key, query_params in imported_redirects:
+            pk = existing_redirects[key]
+
+            if site.pk in site_ids[pk]:
+                if key not in new_redirects:
+                    result['unchanged'] += 1
+                continue
+
+            site_ids[pk].add(site.pk)
+            new_sites.append(StaticRedirect.sites.through(staticredirect_id=pk, site_id=site.pk))
+            if key not in new_redirects:
+                result['updated'] += 1
+
+        StaticRedirect.sites.through.objects.bulk_create(new_sites)
+        StaticRedirectInboundRouteQueryParam.objects.bulk_create(
+            StaticRedirectInboundRouteQueryParam(static_redirect_id=existing_redirects[key], key=name, value=value)
+            for key, (redirect, query_params) in new_redirects.items()
+            for name, value in query_params.items()
+        )
+        return result
 
-    def validate_row(self, row):
+    def get_duplicates(self, keys):
+        keys = set(keys)
+        rules = (
+            StaticRedirect
+            .objects
+            .filter(inbound_route__in={key[1] for key in keys})
+            .order_by('pk')
+            .values_list('sites__domain', 'inbound_route', 'outbound_route', 'query_params_hash', 'pk')
+        )
+        duplicates = {}
+
+        for rule in rules:
+            key = rule[:4]
+            if key in keys:
+                duplicates.setdefault(key, rule[4])
+        return duplicates
+
+    def get_duplicate_message(self, pk):
+        admin_url = StaticRedirect(pk=pk).get_admin_change_url()
+        return _('Rule duplicated with <a href="{}" target="_blank">this one</a>').format(admin_url)
+
+    def clean_row(self, row):
+        """
+        Validates a row on its own and returns the key of the rule it imports.
+        """
         if len(row) < 3:
             raise ValidationError(_(
                 'malformed row. Row must contain site (required), '
@@ -142,10 +396,47 @@ class StaticRedirectImporter(FlattenErrorMixin, object):
         except ValidationError as e:
             raise ValidationError(self.flatten_error(e))
 
-        for dupe in StaticRedirect.objects.filter(inbound_route=inbound_route, outbound_route=outbound_route):
-            dupe_query_params = dupe.query_params.as_dict()
-            if (dupe_query_params == query_params) and (dupe.sites.filter(domain=domain).exists()):
-                admin_url = dupe.get_admin_change_url()
-                raise ValidationError(
-                    _('Rule duplicated with <a href="{}" target="_blank">this one</a>').format(admin_url)
-                )
+        return domain, inbound_route, outbound_route, get_query_params_hash(query_params)
+
+    def validate_row(self, row):
+        key = self.clean_row(row)
+
+        for pk in self.get_duplicates([key]).values():
+            raise ValidationError(self.get_duplicate_message(pk))
+
+
+# Importer of the current validation worker process.
+_worker_importer = None
+
+
+def init_validation_worker(importer_path, chunk_size, sites):
+    global _worker_importer
+
+    # Arguments are plain values, spawned workers set Django up first.
+    if not apps.ready:
+        django.setup()
+
+    sites = [Site(pk=pk, domain=domain, name=name) for pk, domain, name in sites]
+    _worker_importer = import_string(importer_path)(chunk_size=chunk_size, sites=sites)
+
+
+def clean_rows_chunk(numbered_rows):
+    return list(_worker_importer.clean_rows(numbered_rows))
+
+
+def create_validation_pool(importer, processes=None):
+    """
+    Returns a process pool cleaning rows for ``importer.validate_dataset()``.
+    Workers do not query the database.
+    """
+    importer_class = importer.__class__
+    sites = [(site.pk, site.domain, site.name) for site in importer.sites_per_domain.values()]
+    return multiprocessing.Pool(
+        processes,
+        initializer=init_validation_worker,
+        initargs=(
+            '{}.{}'.format(importer_class.__module__, importer_class.__name__),
+            importer.chunk_size,
+            sites,
+        ),
+    )
@@ -0,0 +1,175 @@
+from __future__ import unicode_literals
+
+import csv
+import logging
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .importers import RedirectImporter, StaticRedirectImporter
+from .models import ImportJob
+from .utils import get_chunks, read_import_rows
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobReclaimed(Exception):
+    """
+    Another runner claimed the job, it stopped reporting progress for too long.
+    """
+
+
+class ImportJobRunner(object):
+    """
+    Processes queued import jobs. Every chunk of rows is committed together
+    with the job progress, so an interrupted job resumes after the last
+    committed row.
+
+    Running jobs report progress at least every quarter of
+    ``ALDRYN_REDIRECTS_IMPORT_JOB_TIMEOUT``, validation included; a job
+    claimed by another runner in the meantime is left to it.
+    """
+    importer_classes = {
+        ImportJob.REDIRECT: RedirectImporter,
+        ImportJob.STATIC_REDIRECT: StaticRedirectImporter,
+    }
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size
+
+    def get_stale_timeout(self):
+        return getattr(settings, 'ALDRYN_REDIRECTS_IMPORT_JOB_TIMEOUT', 600)
+
+    def claim_next_job(self):
+        """
+        Marks the oldest pending job, or a running job which stopped reporting
+        progress, as running and returns it. Returns None when there is none.
+        """
+        stale = timezone.now() - timedelta(seconds=self.get_stale_timeout())
+        jobs = ImportJob.objects.filter(
+            Q(status=ImportJob.PENDING) | Q(status=ImportJob.RUNNING, updated_at__lt=stale)
+        ).order_by('pk')
+
+        for job in jobs:
+            # Conditional update, so concurrent runners never claim the same job.
+            claimed = ImportJob.objects.filter(
+                pk=job.pk, status=job.status, updated_at=job.updated_at,
+            ).update(status=ImportJob.RUNNING, updated_at=timezone.now())
+
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+
+    def save_progress(self, job, **fields):
+        """
+        Updates fields of job, and its updated_at, unless another runner
+        claimed it in the meantime. Returns whether job was updated.
+        """
+        fields['updated_at'] = timezone.now()
+        updated = ImportJob.objects.filter(
+            pk=job.pk, status=ImportJob.RUNNING, updated_at=job.updated_at,
+        ).update(**fields)
+
+        if updated:
+            for name, value in fields.items():
+                setattr(job, name, value)
+        return bool(updated)
+
+    def heartbeat(self, job):
+        """
+        Saves progress when due, so other runners do not claim job.
+        """
+        interval = timedelta(seconds=self.get_stale_timeout() / 4)
+
+        if timezone.now() - job.updated_at >= interval and not self.save_progress(job):
+            raise JobReclaimed()
+
+    def get_rows(self, job):
+        job.csv_file.open('rb')
+        try:
+            for row in read_import_rows(job.csv_file):
+                yield row
+        finally:
+            job.csv_file.close()
+
+    def run_pending(self):
+        """
+        Runs jobs until none is left, returns the jobs run.
+        """
+        jobs = []
+        job = self.claim_next_job()
+
+        while job:
+            self.run(job)
+            jobs.append(job)
+            job = self.claim_next_job()
+        return jobs
+
+    def run(self, job):
+        importer = self.importer_classes[job.kind](chunk_size=self.chunk_size)
+
+        try:
+            if job.total_rows is None and not self.validate(job, importer):
+                return
+            self.import_rows(job, importer)
+        except JobReclaimed:
+            logger.warning('Import job %s was claimed by another runner', job.pk)
+        except (csv.Error, UnicodeDecodeError) as e:
+            self.fail(job, 'Invalid csv file: {}'.format(e))
+        except Exception as e:
+            logger.exception('Import job %s failed', job.pk)
+            self.fail(job, str(e))
+
+    def validate(self, job, importer):
+        # Rows are counted on the way through, validation reads the file once.
+        total_rows = [0]
+
+        def count(rows):
+            for row in rows:
+                total_rows[0] += 1
+                self.heartbeat(job)
+                yield row
+
+        errors = importer.validate_dataset(count(self.get_rows(job)))
+
+        if errors:
+            self.fail(job, '\n'.join(
+                'Line {}: {}'.format(line, ' '.join(messages))
+                for line, messages in errors.items()
+            ))
+            return False
+
+        if not self.save_progress(job, total_rows=total_rows[0]):
+            raise JobReclaimed()
+        return True
+
+    def import_rows(self, job, importer):
+        rows = islice(self.get_rows(job), job.processed_rows, None)
+
+        for chunk in get_chunks(rows, importer.chunk_size):
+            with transaction.atomic():
+                result = importer.import_from_dataset(chunk)
+                saved = self.save_progress(
+                    job,
+                    processed_rows=job.processed_rows + len(chunk),
+                    created_count=job.created_count + result['created'],
+                    updated_count=job.updated_count + result['updated'],
+                    unchanged_count=job.unchanged_count + result['unchanged'],
+                )
+                if not saved:
+                    # Rolls the chunk back, the other runner imports it.
+                    raise JobReclaimed()
+            logger.info('Import job %s: %s/%s rows', job.pk, job.processed_rows, job.total_rows)
+
+        if not self.save_progress(job, status=ImportJob.DONE):
+            raise JobReclaimed()
+
+    def fail(self, job, message):
+        if not self.save_progress(job, status=ImportJob.FAILED, errors=message):
+            logger.warning('Import job %s was claimed by another runner', job.pk)
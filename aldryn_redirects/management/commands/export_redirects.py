@@ -0,0 +1,56 @@
+from __future__ import unicode_literals
+
+import io
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.utils.encoding import force_text
+from tablib import Dataset
+
+from aldryn_redirects.exporters import RedirectExporter, StaticRedirectExporter
+from aldryn_redirects.models import Redirect, StaticRedirect
+
+
+class Command(BaseCommand):
+    help = 'Exports redirects to a csv file in the format of the admin export.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='csv file to write, "-" writes to stdout.',
+        )
+        parser.add_argument(
+            '--static', action='store_true', default=False,
+            help='Export static redirects instead of multilanguage redirects.',
+        )
+
+    def handle(self, *args, **options):
+        if options['static']:
+            exporter, queryset = StaticRedirectExporter(), StaticRedirect.objects.all()
+        else:
+            exporter, queryset = RedirectExporter(), Redirect.objects.all()
+
+        path = options['path']
+        started = time.time()
+
+        if path == '-':
+            count = self.export(exporter, queryset, partial(self.stdout.write, ending=''))
+            # The csv goes to stdout, the summary must not end up in it.
+            log = self.stderr
+        else:
+            with io.open(path, 'w', encoding='utf-8', newline='') as csv_file:
+                count = self.export(exporter, queryset, csv_file.write)
+            log = self.stdout
+
+        elapsed = max(time.time() - started, 0.001)
+        log.write('Exported {} rows in {:.2f}s ({:.0f} rows/s).'.format(count, elapsed, count / elapsed))
+
+    def export(self, exporter, queryset, write):
+        write(force_text(Dataset(headers=exporter.headers).csv))
+        count = 0
+
+        for dataset in exporter.get_datasets(queryset):
+            write(force_text(dataset.csv))
+            count += dataset.height
+        return count
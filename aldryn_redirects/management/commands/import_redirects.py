@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from aldryn_redirects.importers import RedirectImporter, StaticRedirectImporter, create_validation_pool
+from aldryn_redirects.utils import read_import_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports redirects from a csv file in the format of the admin export.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='csv file to import, "-" reads stdin.',
+        )
+        parser.add_argument(
+            '--static', action='store_true', default=False,
+            help='Import static redirects instead of multilanguage redirects.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Processes validating rows, defaults to the number of CPUs. 1 validates in this process.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows validated and committed at once.',
+        )
+
+    def handle(self, *args, **options):
+        importer_class = StaticRedirectImporter if options['static'] else RedirectImporter
+        importer = importer_class(chunk_size=options['chunk_size'])
+
+        started = time.time()
+        rows = self.read_rows(options['path'])
+        errors = self.validate(importer, rows, options['processes'])
+        self.report('Validated', len(rows), started)
+
+        if errors:
+            for line, messages in errors.items():
+                self.stderr.write('Line {}: {}'.format(line, ' '.join(messages)))
+            raise CommandError('{} invalid rows, nothing was imported.'.format(len(errors)))
+
+        # Writes stay in this process, one committed chunk after the other.
+        started = time.time()
+        result = importer.import_from_dataset(rows)
+        self.report('Imported', len(rows), started)
+        self.stdout.write('{created} created, {updated} updated, {unchanged} unchanged.'.format(**result))
+
+    def read_rows(self, path):
+        try:
+            if path == '-':
+                return list(read_import_rows(getattr(sys.stdin, 'buffer', sys.stdin)))
+
+            with open(path, 'rb') as csv_file:
+                return list(read_import_rows(csv_file))
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise CommandError('Invalid csv file: {}'.format(e))
+
+    def validate(self, importer, rows, processes):
+        if processes == 1:
+            return importer.validate_dataset(rows)
+
+        # Forked workers must not share the database connections.
+        connections.close_all()
+        pool = create_validation_pool(importer, processes)
+        try:
+            return importer.validate_dataset(rows, pool=pool)
+        finally:
+            pool.close()
+            pool.join()
+
+    def report(self, action, count, started):
+        elapsed = max(time.time() - started, 0.001)
+        self.stdout.write('{} {} rows in {:.2f}s ({:.0f} rows/s).'.format(action, count, elapsed, count / elapsed))
@@ -0,0 +1,38 @@
+from __future__ import unicode_literals
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from aldryn_redirects.jobs import ImportJobRunner
+
+
+class Command(BaseCommand):
+    help = 'Runs the queued redirect import jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true', default=False,
+            help='Keep polling for new jobs instead of exiting once the queue is empty.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Seconds to wait between polls with --loop.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows committed at once.',
+        )
+
+    def handle(self, *args, **options):
+        runner = ImportJobRunner(chunk_size=options['chunk_size'])
+
+        while True:
+            for job in runner.run_pending():
+                self.stdout.write('{}: {} ({}/{} rows)'.format(
+                    job, job.status, job.processed_rows, job.total_rows or 0,
+                ))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -3,23 +3,22 @@ from __future__ import unicode_literals
 from django.conf import settings
 from django.db import models
 
-from .utils import get_query_params_dict
+from .utils import get_query_params_dict, get_query_params_hash
 
 
 class StaticRedirectManager(models.QuerySet):
     def get_for_request(self, request):
         path_info = request.path_info
-        request_query_params = get_query_params_dict(request.get_full_path())
+        query_params_hash = get_query_params_hash(get_query_params_dict(request.get_full_path()))
 
         if settings.APPEND_SLASH and path_info.endswith('/'):
-            candidates = self.filter(sites__id__exact=settings.SITE_ID, inbound_route=path_info[:-1])
-        else:
-            candidates = self.filter(sites__id__exact=settings.SITE_ID, inbound_route=path_info)
-
-        for candidate in candidates:
-            candidate_query_params = candidate.query_params.as_dict()
-            if candidate_query_params == request_query_params:
-                return candidate
+            path_info = path_info[:-1]
+
+        return self.filter(
+            sites__id__exact=settings.SITE_ID,
+            inbound_route=path_info,
+            query_params_hash=query_params_hash,
+        ).order_by('pk').first()
 
 
 class StaticRedirectInboundRouteQueryParamManager(models.QuerySet):
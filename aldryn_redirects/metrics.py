@@ -0,0 +1,184 @@
+from __future__ import unicode_literals
+
+import bisect
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.utils.module_loading import import_string
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float('inf'))
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, float('inf'))
+
+
+class BaseSink(object):
+    """
+    Receives the metrics of the redirect lookups.
+    """
+    enabled = True
+
+    def increment(self, name, value=1):
+        raise NotImplementedError
+
+    def observe(self, name, value):
+        """
+        Adds a value to the histogram name. Latencies are in seconds and
+        named ``*_seconds``.
+        """
+        raise NotImplementedError
+
+
+class NullSink(BaseSink):
+    """
+    Used when metrics are disabled, nothing is measured at all.
+    """
+    enabled = False
+
+    def increment(self, name, value=1):
+        pass
+
+    def observe(self, name, value):
+        pass
+
+
+class MemorySink(BaseSink):
+    """
+    Keeps counters and histograms in process, see ``get_metrics()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = defaultdict(int)
+            # {name: [count, sum, [count per bucket]]}
+            self.histograms = {}
+
+    def get_buckets(self, name):
+        return LATENCY_BUCKETS if name.endswith('_seconds') else COUNT_BUCKETS
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        buckets = self.get_buckets(name)
+        index = bisect.bisect_left(buckets, value)
+
+        with self._lock:
+            histogram = self.histograms.setdefault(name, [0, 0, [0] * len(buckets)])
+            histogram[0] += 1
+            histogram[1] += value
+            histogram[2][index] += 1
+
+    def get_metrics(self):
+        """
+        Returns the counters and the histograms, with cumulative
+        ``(upper bound, count)`` buckets like Prometheus.
+        """
+        with self._lock:
+            histograms = {}
+
+            for name, (count, total, bucket_counts) in self.histograms.items():
+                cumulative, buckets = 0, []
+                for bound, bucket_count in zip(self.get_buckets(name), bucket_counts):
+                    cumulative += bucket_count
+                    buckets.append((bound, cumulative))
+                histograms[name] = {'count': count, 'sum': total, 'buckets': buckets}
+            return {'counters': dict(self.counters), 'histograms': histograms}
+
+
+class CallbackSink(BaseSink):
+    """
+    Hands every metric to ``callback(type, name, value)``, type being
+    ``'counter'`` or ``'histogram'``. Meant for StatsD or Prometheus clients.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def increment(self, name, value=1):
+        self.callback('counter', name, value)
+
+    def observe(self, name, value):
+        self.callback('histogram', name, value)
+
+
+@contextmanager
+def timed(name):
+    """
+    Observes the time spent in the block as name.
+    """
+    sink = get_sink()
+
+    if not sink.enabled:
+        yield
+        return
+
+    started = default_timer()
+    try:
+        yield
+    finally:
+        sink.observe(name, default_timer() - started)
+
+
+class QueryCounter(object):
+    """
+    Counts the queries of the default database run within the block.
+    """
+
+    def __enter__(self):
+        self.force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        # The log drops its oldest entries once full, its length stops growing.
+        self.last = connection.queries_log[-1] if connection.queries_log else None
+        self.count = 0
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection.force_debug_cursor = self.force_debug_cursor
+        for query in reversed(connection.queries_log):
+            if query is self.last:
+                break
+            self.count += 1
+
+
+_sink = None
+
+
+def get_sink():
+    """
+    Returns the sink configured by ``ALDRYN_REDIRECTS_METRICS_SINK``, the
+    dotted path of a ``BaseSink`` subclass or of a callback.
+    """
+    global _sink
+
+    if _sink is None:
+        path = getattr(settings, 'ALDRYN_REDIRECTS_METRICS_SINK', None)
+
+        if not path:
+            _sink = NullSink()
+        else:
+            sink = import_string(path)
+            if isinstance(sink, type) and issubclass(sink, BaseSink):
+                _sink = sink()
+            else:
+                _sink = CallbackSink(sink)
+    return _sink
+
+
+def reset_sink(setting, **kwargs):
+    global _sink
+
+    if setting == 'ALDRYN_REDIRECTS_METRICS_SINK':
+        _sink = None
+
+
+setting_changed.connect(reset_sink)
@@ -1,44 +1,94 @@
 from __future__ import unicode_literals
 
+import sys
+from timeit import default_timer
+
 from django import http
 from django.conf import settings
-from django.contrib.sites.models import Site
-from django.db.models import Q
 
-from .models import Redirect, StaticRedirect
+from .engines import get_eager_engine, get_engine, is_excluded_path
+from .hits import hit_counter
+from .metrics import QueryCounter, get_sink
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:  # COMPAT: Django < 1.10
+    MiddlewareMixin = object
+
+if sys.version_info >= (3, 5):
+    from .asynchronous import AsyncMiddlewareMixin
+else:  # COMPAT: Python 2
+    AsyncMiddlewareMixin = object
+
+
+class RedirectFallbackMiddleware(AsyncMiddlewareMixin, MiddlewareMixin):
+    """
+    Works in ``MIDDLEWARE`` as well as in ``MIDDLEWARE_CLASSES``, and in
+    async middleware chains, see ``AsyncMiddlewareMixin``.
 
+    With ``ALDRYN_REDIRECTS_NOT_FOUND_ONLY``, only eager static redirects are
+    looked up before the view; all rules are looked up for 404 responses.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def is_not_found_only(self):
+        return getattr(settings, 'ALDRYN_REDIRECTS_NOT_FOUND_ONLY', False)
+
+    def get_request_engine(self):
+        return get_eager_engine() if self.is_not_found_only() else get_engine()
+
+    def should_resolve_response(self, response):
+        return response.status_code == 404 and self.is_not_found_only()
 
-class RedirectFallbackMiddleware(object):
     def process_request(self, request):
-        static_redirect = StaticRedirect.objects.get_for_request(request)
-        if static_redirect:
-            full_domain = '{}://{}'.format(request.scheme, Site.objects.get(id=settings.SITE_ID).domain)
-            return http.HttpResponsePermanentRedirect(static_redirect.get_outbound_url(full_domain))
-
-        path = request.path_info
-        path_with_queries = request.get_full_path()
-        queries = (
-            Q(old_path__iexact=path)
-            | Q(old_path__iexact=path_with_queries)
-        )
-
-        if settings.APPEND_SLASH and path.endswith('/'):
-            path_with_queries_no_slash = path[:-1] + path_with_queries[len(path):]
-            queries |= (
-                Q(old_path__iexact=path[:-1])
-                | Q(old_path__iexact=path_with_queries_no_slash)
-            )
-
-        try:
-            r = Redirect.objects.filter(
-                queries,
-                site__id__exact=settings.SITE_ID
-            ).distinct().get()
-        except Redirect.DoesNotExist:
-            return
-
-        new_path = r.safe_translation_getter('new_path', any_language=True)
-
-        if new_path in (None, ''):
+        return self.get_redirect_response(self.resolve(self.get_request_engine(), request))
+
+    def process_response(self, request, response):
+        if self.should_resolve_response(response):
+            return self.get_redirect_response(self.resolve(get_engine(), request)) or response
+        return response
+
+    def resolve(self, engine, request):
+        sink = get_sink()
+
+        if is_excluded_path(request.path_info):
+            sink.increment('lookups.excluded')
+            return None
+
+        if sink.enabled:
+            match = self.resolve_measured(engine, request, sink)
+        else:
+            match = engine.resolve(request)
+
+        if match is not None and getattr(settings, 'ALDRYN_REDIRECTS_COUNT_HITS', True):
+            hit_counter.record(match)
+        return match
+
+    def get_redirect_response(self, match):
+        if match is None:
+            return None
+
+        if match.url in (None, ''):
             return http.HttpResponseGone()
-        return http.HttpResponsePermanentRedirect(new_path)
+        return http.HttpResponsePermanentRedirect(match.url)
+
+    def resolve_measured(self, engine, request, sink):
+        started = default_timer()
+        with QueryCounter() as queries:
+            match = engine.resolve(request)
+
+        self.record_lookup(sink, match, default_timer() - started)
+        sink.observe('lookup_queries', queries.count)
+        return match
+
+    def record_lookup(self, sink, match, elapsed):
+        if match is None:
+            outcome = 'miss'
+        elif match.url in (None, ''):
+            outcome = 'gone'
+        else:
+            outcome = match.kind
+
+        sink.increment('lookups.{}'.format(outcome))
+        sink.observe('lookup_seconds.{}'.format(outcome), elapsed)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:33
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from aldryn_redirects.utils import get_query_params_hash
+
+
+def forwards(apps, schema_editor):
+    StaticRedirect = apps.get_model('aldryn_redirects', 'StaticRedirect')
+    StaticRedirectInboundRouteQueryParam = apps.get_model('aldryn_redirects', 'StaticRedirectInboundRouteQueryParam')
+
+    query_params = {}
+    params = StaticRedirectInboundRouteQueryParam.objects.order_by('pk').values_list('static_redirect_id', 'key', 'value')
+    for static_redirect_id, key, value in params.iterator():
+        query_params.setdefault(static_redirect_id, {})[key] = value
+
+    for static_redirect_id, params in query_params.items():
+        (
+            StaticRedirect
+            .objects
+            .filter(pk=static_redirect_id)
+            .update(query_params_hash=get_query_params_hash(params))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_redirects', '0004_auto_20171208_1702'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staticredirect',
+            name='query_params_hash',
+            field=models.CharField(default='d41d8cd98f00b204e9800998ecf8427e', editable=False, max_length=32),
+        ),
+        migrations.AlterIndexTogether(
+            name='staticredirect',
+            index_together=set([('inbound_route', 'query_params_hash')]),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:34
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from aldryn_redirects.utils import get_redirect_key
+
+
+def forwards(apps, schema_editor):
+    Redirect = apps.get_model('aldryn_redirects', 'Redirect')
+
+    for pk, old_path in Redirect.objects.values_list('pk', 'old_path').iterator():
+        Redirect.objects.filter(pk=pk).update(old_path_key=get_redirect_key(old_path))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sites', '0001_initial'),
+        ('aldryn_redirects', '0005_staticredirect_query_params_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redirect',
+            name='old_path_key',
+            field=models.CharField(default='', editable=False, max_length=400),
+        ),
+        migrations.AlterIndexTogether(
+            name='redirect',
+            index_together=set([('site', 'old_path_key')]),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:45
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_redirects', '0006_redirect_old_path_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('redirect', 'Multilanguage Redirects'), ('static_redirect', 'Static Redirects')], max_length=20, verbose_name='kind')),
+                ('csv_file', models.FileField(upload_to='aldryn_redirects/imports/', verbose_name='csv file')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10, verbose_name='status')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='total rows')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='processed rows')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='created')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='updated')),
+                ('unchanged_count', models.PositiveIntegerField(default=0, verbose_name='unchanged')),
+                ('errors', models.TextField(blank=True, verbose_name='errors')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'Import Job',
+                'verbose_name_plural': 'Import Jobs',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:49
+from __future__ import unicode_literals
+
+import aldryn_redirects.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sites', '0001_initial'),
+        ('aldryn_redirects', '0007_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefixRedirect',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inbound_prefix', models.CharField(help_text='Every path starting with this one is redirected. Do not provide the domain. Always add a leading slash here.', max_length=255, validators=[aldryn_redirects.validators.validate_inbound_route], verbose_name='Redirect from')),
+                ('outbound_route', models.CharField(help_text='Redirect destination. Domain is not required (defaults to inbound route domain).', max_length=255, validators=[aldryn_redirects.validators.validate_outbound_route], verbose_name='Redirect to')),
+                ('keep_remainder', models.BooleanField(default=True, help_text='Append the rest of the path and the query string to the destination, so /old-blog/post/ redirects to /blog/post/.', verbose_name='Keep remainder')),
+                ('sites', models.ManyToManyField(related_name='_prefixredirect_sites_+', to='sites.Site')),
+            ],
+            options={
+                'verbose_name': 'Prefix Redirect',
+                'verbose_name_plural': 'Prefix Redirects',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:51
+from __future__ import unicode_literals
+
+import aldryn_redirects.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sites', '0001_initial'),
+        ('aldryn_redirects', '0008_prefixredirect'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegexRedirect',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pattern', models.CharField(help_text='Regular expression matching the whole path, query string included, for example /product\\.php\\?id=(\\d+). Rules are tried in the order they were created.', max_length=255, validators=[aldryn_redirects.validators.validate_regex], verbose_name='Pattern')),
+                ('replacement', models.CharField(help_text='Redirect destination, groups of the pattern are inserted with \\1 or \\g<name>. Domain is not required (defaults to inbound route domain).', max_length=255, verbose_name='Redirect to')),
+                ('sites', models.ManyToManyField(related_name='_regexredirect_sites_+', to='sites.Site')),
+            ],
+            options={
+                'verbose_name': 'Regex Redirect',
+                'verbose_name_plural': 'Regex Redirects',
+            },
+        ),
+    ]
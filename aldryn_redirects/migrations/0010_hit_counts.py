@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:55
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_redirects', '0009_regexredirect'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redirect',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='hits'),
+        ),
+        migrations.AddField(
+            model_name='redirect',
+            name='last_hit_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last hit'),
+        ),
+        migrations.AddField(
+            model_name='staticredirect',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='hits'),
+        ),
+        migrations.AddField(
+            model_name='staticredirect',
+            name='last_hit_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last hit'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 08:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_redirects', '0010_hit_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staticredirect',
+            name='eager',
+            field=models.BooleanField(default=False, help_text='Redirect even when the page exists, see ALDRYN_REDIRECTS_NOT_FOUND_ONLY.', verbose_name='Eager'),
+        ),
+    ]
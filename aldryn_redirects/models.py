@@ -1,23 +1,30 @@
 from __future__ import unicode_literals
 
+import re
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.sites.models import Site
-from django.core.urlresolvers import reverse
-from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _, ugettext
 
 from parler.models import TranslatableModel, TranslatedFields
-from six.moves.urllib.parse import urlparse, urljoin
+
+from six import python_2_unicode_compatible
 
 from .managers import StaticRedirectManager, StaticRedirectInboundRouteQueryParamManager
-from .utils import add_query_params_to_url
-from .validators import validate_inbound_route, validate_outbound_route
+from .utils import add_query_params_to_url, build_absolute_url, get_query_params_hash, get_redirect_key
+from .validators import validate_inbound_route, validate_outbound_route, validate_regex
+
+try:
+    from django.urls import reverse
+except ImportError:  # COMPAT: Django < 1.10
+    from django.core.urlresolvers import reverse
 
 
 @python_2_unicode_compatible
 class Redirect(TranslatableModel):
     site = models.ForeignKey(
-        Site, related_name='aldryn_redirects_redirect_set')
+        Site, related_name='aldryn_redirects_redirect_set', on_delete=models.CASCADE)
     old_path = models.CharField(
         _('redirect from'), max_length=400, db_index=True,
         help_text=_(
@@ -25,6 +32,10 @@ class Redirect(TranslatableModel):
             "Example: '/events/search/'."
         ),
     )
+    # Normalized old_path, so lookups can use an index instead of iexact.
+    old_path_key = models.CharField(max_length=400, editable=False, default='')
+    hit_count = models.PositiveIntegerField(_('hits'), default=0, editable=False)
+    last_hit_at = models.DateTimeField(_('last hit'), null=True, blank=True, editable=False)
     translations = TranslatedFields(
         new_path=models.CharField(
             _('redirect to'), max_length=400, blank=True,
@@ -39,6 +50,7 @@ class Redirect(TranslatableModel):
         verbose_name = _('Multilanguage Redirect')
         verbose_name_plural = _('Multilanguage Redirects')
         unique_together = (('site', 'old_path'),)
+        index_together = (('site', 'old_path_key'),)
         ordering = ('old_path',)
 
     def __str__(self):
@@ -50,6 +62,13 @@ class Redirect(TranslatableModel):
             new_paths = ugettext('None')
         return "{} ---> {}".format(self.old_path or 'None', new_paths)
 
+    def save(self, *args, **kwargs):
+        self.old_path_key = get_redirect_key(self.old_path)
+        super(Redirect, self).save(*args, **kwargs)
+
+
+RedirectTranslation = Redirect._parler_meta.root_model
+
 
 class StaticRedirect(models.Model):
     sites = models.ManyToManyField('sites.Site', related_name='+')
@@ -66,12 +85,22 @@ class StaticRedirect(models.Model):
         validators=[validate_outbound_route, ],
         help_text=_('Redirect destination. Domain is not required (defaults to inbound route domain).'),
     )
+    eager = models.BooleanField(
+        _('Eager'),
+        default=False,
+        help_text=_('Redirect even when the page exists, see ALDRYN_REDIRECTS_NOT_FOUND_ONLY.'),
+    )
+    # Denormalized from query_params, so a request is matched with a single lookup.
+    query_params_hash = models.CharField(max_length=32, editable=False, default=get_query_params_hash({}))
+    hit_count = models.PositiveIntegerField(_('hits'), default=0, editable=False)
+    last_hit_at = models.DateTimeField(_('last hit'), null=True, blank=True, editable=False)
 
     objects = StaticRedirectManager.as_manager()
 
     class Meta:
         verbose_name = _('Static Redirect')
         verbose_name_plural = _('Static Redirects')
+        index_together = (('inbound_route', 'query_params_hash'),)
 
     def __str__(self):
         return '{} --> {}'.format(self.inbound_route, self.outbound_route)
@@ -83,15 +112,15 @@ class StaticRedirect(models.Model):
         )
 
     def get_outbound_url(self, domain):
-        parsed_outbound_route = urlparse(self.outbound_route)
-        if parsed_outbound_route.netloc and parsed_outbound_route.scheme:
-            return self.outbound_route
-
-        return urljoin(domain, self.outbound_route)
+        return build_absolute_url(self.outbound_route, domain)
 
     def get_full_inbound_route(self):
         return add_query_params_to_url(self.inbound_route, self.query_params.as_dict())
 
+    def update_query_params_hash(self):
+        self.query_params_hash = get_query_params_hash(self.query_params.as_dict())
+        StaticRedirect.objects.filter(pk=self.pk).update(query_params_hash=self.query_params_hash)
+
 
 class StaticRedirectInboundRouteQueryParam(models.Model):
     static_redirect = models.ForeignKey(StaticRedirect, related_name='query_params', on_delete=models.CASCADE)
@@ -102,3 +131,134 @@ class StaticRedirectInboundRouteQueryParam(models.Model):
 
     def __str__(self):
         return '{}="{}"'.format(self.key, self.value)
+
+
+@python_2_unicode_compatible
+class PrefixRedirect(models.Model):
+    sites = models.ManyToManyField('sites.Site', related_name='+')
+    inbound_prefix = models.CharField(
+        _('Redirect from'),
+        max_length=255,
+        validators=[validate_inbound_route, ],
+        help_text=_(
+            'Every path starting with this one is redirected. Do not provide the domain. '
+            'Always add a leading slash here.'
+        ),
+    )
+    outbound_route = models.CharField(
+        _('Redirect to'),
+        max_length=255,
+        validators=[validate_outbound_route, ],
+        help_text=_('Redirect destination. Domain is not required (defaults to inbound route domain).'),
+    )
+    keep_remainder = models.BooleanField(
+        _('Keep remainder'),
+        default=True,
+        help_text=_(
+            'Append the rest of the path and the query string to the destination, '
+            'so /old-blog/post/ redirects to /blog/post/.'
+        ),
+    )
+
+    class Meta:
+        verbose_name = _('Prefix Redirect')
+        verbose_name_plural = _('Prefix Redirects')
+
+    def __str__(self):
+        return '{}* --> {}'.format(self.inbound_prefix, self.outbound_route)
+
+
+@python_2_unicode_compatible
+class RegexRedirect(models.Model):
+    sites = models.ManyToManyField('sites.Site', related_name='+')
+    pattern = models.CharField(
+        _('Pattern'),
+        max_length=255,
+        validators=[validate_regex, ],
+        help_text=_(
+            'Regular expression matching the whole path, query string included, '
+            'for example /product\\.php\\?id=(\\d+). Rules are tried in the order they were created.'
+        ),
+    )
+    replacement = models.CharField(
+        _('Redirect to'),
+        max_length=255,
+        help_text=_(
+            'Redirect destination, groups of the pattern are inserted with \\1 or \\g<name>. '
+            'Domain is not required (defaults to inbound route domain).'
+        ),
+    )
+
+    class Meta:
+        verbose_name = _('Regex Redirect')
+        verbose_name_plural = _('Regex Redirects')
+
+    def __str__(self):
+        return '{} --> {}'.format(self.pattern, self.replacement)
+
+    def clean(self):
+        # The host is written out, groups of the request never choose it.
+        if not re.match(r'^(https?://[^/?#\\]+([/?#]|$)|/)', self.replacement):
+            raise ValidationError({'replacement': _(
+                'Provide this as either a full url (http://example.com/dest) or a full path (/dest).'
+            )})
+
+        try:
+            regex = re.compile(self.pattern)
+        except re.error:
+            return  # Reported by the validator of pattern.
+
+        for number, name in re.findall(r'\\(?:(\d+)|g<(\w+)>)', self.replacement):
+            if number and int(number) > regex.groups or name and name not in regex.groupindex:
+                raise ValidationError({'replacement': _('Unknown group {}.').format(number or name)})
+
+
+@python_2_unicode_compatible
+class ImportJob(models.Model):
+    REDIRECT = 'redirect'
+    STATIC_REDIRECT = 'static_redirect'
+    KIND_CHOICES = (
+        (REDIRECT, _('Multilanguage Redirects')),
+        (STATIC_REDIRECT, _('Static Redirects')),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+
+    kind = models.CharField(_('kind'), max_length=20, choices=KIND_CHOICES)
+    csv_file = models.FileField(_('csv file'), upload_to='aldryn_redirects/imports/')
+    status = models.CharField(_('status'), max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    # Set once the file is validated, the rows before processed_rows are committed.
+    total_rows = models.PositiveIntegerField(_('total rows'), null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(_('processed rows'), default=0)
+    created_count = models.PositiveIntegerField(_('created'), default=0)
+    updated_count = models.PositiveIntegerField(_('updated'), default=0)
+    unchanged_count = models.PositiveIntegerField(_('unchanged'), default=0)
+    errors = models.TextField(_('errors'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Import Job')
+        verbose_name_plural = _('Import Jobs')
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return '{} #{}'.format(self.get_kind_display(), self.pk)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def get_progress(self):
+        if not self.total_rows:
+            return 100 if self.status == self.DONE else 0
+        return 100 * self.processed_rows // self.total_rows
@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+import six
+
+
+def get_estimated_count(queryset):
+    """
+    Returns the number of rows of queryset as estimated by the query planner,
+    without running it. Returns None when the database can not tell, only
+    PostgreSQL does.
+    """
+    connection = connections[queryset.db]
+
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) {}'.format(sql), params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, six.string_types):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the estimated count of the query planner when it is above
+    ``ALDRYN_REDIRECTS_ESTIMATED_COUNT_THRESHOLD`` (defaults to ``100000``),
+    so large changelists skip the ``COUNT(*)`` over the whole table. Smaller
+    counts, where estimates are off the most, are exact.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = get_estimated_count(self.object_list)
+            threshold = getattr(settings, 'ALDRYN_REDIRECTS_ESTIMATED_COUNT_THRESHOLD', 100000)
+
+            if estimate is not None and estimate >= threshold:
+                return estimate
+        return super(EstimatedCountPaginator, self).count
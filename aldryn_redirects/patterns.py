@@ -0,0 +1,108 @@
+from __future__ import unicode_literals
+
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+# Global inline flags, such as (?i), at the start of a pattern.
+LEADING_FLAGS = re.compile(r'^(?:\(\?[aiLmsux]+\))+')
+# Escapes are matched first, so an escaped backslash never reads as a backreference.
+SPECIAL_TOKENS = re.compile(r'\\.|\(\?[aiLmsux]+\)|\(\?\(\d')
+
+
+def anchor_pattern(pattern):
+    """
+    Returns pattern matching whole paths only. Leading global flags stay in
+    front, Python 3.11+ rejects them anywhere else.
+    """
+    flags = LEADING_FLAGS.match(pattern)
+    flags = flags.group() if flags else ''
+    return '{}(?:{})\\Z'.format(flags, pattern[len(flags):])
+
+
+def is_combinable(pattern):
+    """
+    Whether pattern behaves the same as a branch of a combined pattern.
+    Global flags would apply to every branch, and numeric backreferences
+    would point to the groups of the branches before.
+    """
+    for token in SPECIAL_TOKENS.findall(pattern):
+        if not token.startswith('\\') or token[1] in '123456789':
+            return False
+    return True
+
+
+class RegexRuleSet(object):
+    """
+    Regex rules compiled into a single alternation, so a path is scanned once
+    whatever the number of rules. Rules match the whole path and the first
+    one added wins. Rules which can not be combined are matched one by one.
+    """
+
+    def __init__(self, rules):
+        # [(compiled pattern, value)], in the order rules were added.
+        self.rules = []
+        # Indexes of the rules missing from the combined pattern.
+        self.separate = []
+        branches = []
+
+        for pattern, value in rules:
+            try:
+                regex = re.compile(anchor_pattern(pattern))
+            except re.error:
+                logger.warning('Skipped invalid redirect pattern %r.', pattern)
+                continue
+
+            if is_combinable(pattern):
+                branches.append('(?P<_{}>{})'.format(len(self.rules), regex.pattern))
+            else:
+                self.separate.append(len(self.rules))
+            self.rules.append((regex, value))
+
+        try:
+            self.combined = re.compile('|'.join(branches)) if branches else None
+        except (re.error, AssertionError, OverflowError):
+            # Group names shared by several rules or, on Python 2, more than 100 groups.
+            logger.warning('Redirect patterns can not be combined, they are matched one by one.')
+            self.combined = None
+
+    def match_each(self, path, start=0):
+        for regex, value in self.rules[start:]:
+            match = regex.match(path)
+            if match:
+                return value, match
+        return None
+
+    def match(self, path):
+        """
+        Returns ``(value, match)`` for the first rule matching path, or None.
+        """
+        if self.combined is None:
+            return self.match_each(path)
+
+        match = self.combined.match(path)
+        # The branch closes after the groups of its rule, so it is the last group.
+        candidate = int(match.lastgroup[1:]) if match else len(self.rules)
+
+        # Separate rules added before the candidate take precedence.
+        for index in self.separate:
+            if index > candidate:
+                break
+            regex, value = self.rules[index]
+            separate_match = regex.match(path)
+            if separate_match:
+                return value, separate_match
+
+        if match:
+            regex, value = self.rules[candidate]
+            rule_match = regex.match(path)
+            if rule_match:
+                return value, rule_match
+            # The combined pattern and the rule disagree, the rules after it decide.
+            return self.match_each(path, candidate + 1)
+        return None
+
+    def __len__(self):
+        return len(self.rules)
@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+
+from django.contrib.sites.models import Site
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .engines import get_eager_engine, get_engine
+from .models import (
+    PrefixRedirect, Redirect, RedirectTranslation, RegexRedirect, StaticRedirect, StaticRedirectInboundRouteQueryParam,
+)
+
+
+def invalidate_rules():
+    get_engine().invalidate()
+    # The engine has changed the rules version already.
+    get_eager_engine().clear()
+
+
+def invalidate_redirects(sender, using=None, **kwargs):
+    invalidate_rules()
+
+    # COMPAT: Django < 1.9 has no on_commit
+    if hasattr(transaction, 'on_commit') and transaction.get_connection(using).in_atomic_block:
+        # Until the commit, other processes still read the old rules and may
+        # cache them under the new version: it changes again once committed.
+        transaction.on_commit(invalidate_rules, using=using)
+
+
+def update_query_params_hash(sender, instance, **kwargs):
+    try:
+        static_redirect = instance.static_redirect
+    except StaticRedirect.DoesNotExist:
+        return
+    static_redirect.update_query_params_hash()
+
+
+def connect_signals():
+    # Connected first, the lookups rely on the hash once rules are invalidated.
+    post_save.connect(
+        update_query_params_hash,
+        sender=StaticRedirectInboundRouteQueryParam,
+        dispatch_uid='aldryn_redirects_save_query_params_hash',
+    )
+    post_delete.connect(
+        update_query_params_hash,
+        sender=StaticRedirectInboundRouteQueryParam,
+        dispatch_uid='aldryn_redirects_delete_query_params_hash',
+    )
+
+    senders = (
+        Redirect, RedirectTranslation, StaticRedirect, StaticRedirectInboundRouteQueryParam, PrefixRedirect,
+        RegexRedirect, Site,
+    )
+    for model in senders:
+        post_save.connect(invalidate_redirects, sender=model, dispatch_uid='aldryn_redirects_save_{}'.format(model))
+        post_delete.connect(invalidate_redirects, sender=model, dispatch_uid='aldryn_redirects_delete_{}'.format(model))
+
+    for model in (StaticRedirect, PrefixRedirect, RegexRedirect):
+        m2m_changed.connect(
+            invalidate_redirects,
+            sender=model.sites.through,
+            dispatch_uid='aldryn_redirects_sites_changed_{}'.format(model),
+        )
@@ -0,0 +1,47 @@
+from __future__ import unicode_literals
+
+from .utils import get_path_segments, get_prefix_key
+
+
+class PrefixTrie(object):
+    """
+    Maps path prefixes to values, segment by segment. Finding the longest
+    prefix of a path costs one step per segment of the path, however many
+    prefixes were added.
+    """
+
+    def __init__(self):
+        # Nested {segment: node} dicts, the value of a prefix is kept under None.
+        self.root = {}
+        self.count = 0
+
+    def add(self, prefix, value):
+        """
+        Adds prefix, the first value added for a prefix is kept.
+        """
+        node = self.root
+        for segment in get_path_segments(get_prefix_key(prefix)):
+            node = node.setdefault(segment, {})
+
+        if None not in node:
+            node[None] = value
+            self.count += 1
+
+    def match(self, path):
+        """
+        Returns ``(value, depth)`` for the longest prefix of path, depth being
+        its number of segments, or None.
+        """
+        node = self.root
+        match = (node[None], 0) if None in node else None
+
+        for depth, segment in enumerate(get_path_segments(get_prefix_key(path)), start=1):
+            node = node.get(segment)
+            if node is None:
+                break
+            if None in node:
+                match = (node[None], depth)
+        return match
+
+    def __len__(self):
+        return self.count
@@ -1,4 +1,12 @@
-from six.moves.urllib.parse import urlparse, parse_qsl, urlencode
+import codecs
+import csv
+import hashlib
+from itertools import islice
+
+from django.utils.encoding import force_bytes
+
+import six
+from six.moves.urllib.parse import urlparse, urljoin, parse_qsl, urlencode
 
 
 def get_query_params_dict(url):
@@ -12,3 +20,86 @@ def remove_query_params(url):
 
 def add_query_params_to_url(url, params):
     return urlparse(url)._replace(query=urlencode(params)).geturl()
+
+
+def get_canonical_query(params):
+    # Order independent representation of a query params dict, usable as a lookup key.
+    return urlencode(sorted(params.items()))
+
+
+def get_query_params_hash(params):
+    return hashlib.md5(force_bytes(get_canonical_query(params))).hexdigest()
+
+
+def get_redirect_key(path):
+    # Redirect.old_path is matched case insensitively.
+    return path.lower()
+
+
+def get_prefix_key(path):
+    # PrefixRedirect.inbound_prefix is matched case insensitively, on whole segments.
+    return get_redirect_key(path.rstrip('/'))
+
+
+def get_path_segments(path):
+    return path.rstrip('/').split('/')[1:]
+
+
+def append_path_remainder(url, path, depth, query_string=''):
+    """
+    Appends what follows the first depth segments of path, and the query
+    string, to url.
+    """
+    remainder = path[len('/'.join([''] + get_path_segments(path)[:depth])):]
+    parsed_url = urlparse(url)
+
+    if remainder:
+        parsed_url = parsed_url._replace(path=parsed_url.path.rstrip('/') + remainder)
+
+    if query_string:
+        parsed_url = parsed_url._replace(query='&'.join(filter(None, [parsed_url.query, query_string])))
+    return parsed_url.geturl()
+
+
+def build_absolute_url(url, domain):
+    parsed_url = urlparse(url)
+    if parsed_url.netloc and parsed_url.scheme:
+        return url
+
+    return urljoin(domain, url)
+
+
+def get_chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def read_csv(lines):
+    """
+    Yields the rows of an utf-8 csv file given as an iterable of byte lines,
+    such as an uploaded file, one at a time. The header row is skipped.
+    """
+    if six.PY2:
+        rows = ([cell.decode('utf-8') for cell in row] for row in csv.reader(lines))
+    else:
+        rows = csv.reader(codecs.iterdecode(lines, 'utf-8'))
+
+    for row in islice(rows, 1, None):
+        yield row
+
+
+def read_import_rows(lines):
+    """
+    Yields the non-blank rows of an import csv file as tuples of stripped values.
+    """
+    # Domains repeat on most rows, they share a single string per value.
+    domains = {}
+
+    for row in read_csv(lines):
+        if row:
+            row = tuple(cell.strip() for cell in row)
+            yield (domains.setdefault(row[0], row[0]),) + row[1:]
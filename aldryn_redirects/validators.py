@@ -40,3 +40,12 @@ def validate_outbound_route(value):
         raise ValidationError(_('Invalid URL provided (invalid characters found).'))
 
     return value
+
+
+def validate_regex(value):
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise ValidationError(_('Invalid regular expression: {}').format(e))
+
+    return value
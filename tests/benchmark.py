@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks imports, lookups and exports of aldryn-redirects on synthetic
+rules, and stores the results to compare them across versions::
+
+    python -m tests.benchmark --rows 10000 100000 1000000
+    python -m tests.benchmark --database-url postgres://localhost/redirects_benchmark
+
+Every size runs against an emptied database. Results are appended to
+``--output`` as one JSON object per line, and compared with the last stored
+run of the same size, database and engines.
+"""
+from __future__ import unicode_literals, print_function, division
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+try:
+    import tracemalloc
+except ImportError:  # COMPAT: Python 2
+    tracemalloc = None
+
+
+urlpatterns = []
+
+LANGUAGES = ['en', 'de']
+ENGINES = ['DatabaseEngine', 'CachedEngine', 'TableEngine', 'FilteredEngine']
+
+
+def configure(database_url, directory):
+    import django
+    from django.conf import settings
+
+    if database_url:
+        import dj_database_url
+        database = dj_database_url.parse(database_url)
+    else:
+        database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(directory, 'benchmark.sqlite')}
+
+    settings.configure(
+        DEBUG=False,
+        DATABASES={'default': database},
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.sites',
+            'parler',
+            'aldryn_redirects',
+        ],
+        ROOT_URLCONF='tests.benchmark',
+        SITE_ID=1,
+        USE_I18N=True,
+        LANGUAGE_CODE='en',
+        LANGUAGES=[(language, language) for language in LANGUAGES],
+        PARLER_LANGUAGES={1: [{'code': language} for language in LANGUAGES], 'default': {'fallbacks': ['en']}},
+        ALDRYN_REDIRECTS_REFRESH_INTERVAL=3600,
+    )
+    django.setup()
+
+
+def get_redirect_rows(count):
+    for idx in range(count):
+        for language in LANGUAGES:
+            yield ('example.com', '/old/{}'.format(idx), '/new/{}/{}'.format(language, idx), language)
+
+
+def get_static_redirect_rows(count):
+    for idx in range(count):
+        # Every fourth rule differs from its neighbour by query params only.
+        if idx % 4 == 3:
+            inbound_route = '/static/{}?page={}&sort=asc'.format(idx - 1, idx % 10)
+        else:
+            inbound_route = '/static/{}'.format(idx)
+        yield ('example.com', inbound_route, '/dest/{}'.format(idx))
+
+
+def measure_import(importer_class, rows):
+    importer = importer_class()
+
+    started = default_timer()
+    errors = importer.validate_dataset(rows)
+    validated = default_timer() - started
+    assert not errors, list(errors.items())[:5]
+
+    started = default_timer()
+    importer.import_from_dataset(rows)
+    imported = default_timer() - started
+
+    return {
+        'rows': len(rows),
+        'validate_rows_per_second': round(len(rows) / validated),
+        'import_rows_per_second': round(len(rows) / imported),
+    }
+
+
+def get_requests(count, rules, hit_ratio, seed=0):
+    from django.test.client import RequestFactory
+
+    factory = RequestFactory()
+    generator = random.Random(seed)
+    requests = []
+
+    for idx in range(count):
+        if generator.random() >= hit_ratio:
+            requests.append(factory.get('/missing/{}/'.format(idx)))
+            continue
+
+        rule = generator.randrange(rules)
+        if generator.random() < 0.5:
+            language = generator.choice(LANGUAGES)
+            requests.append(factory.get('/old/{}/'.format(rule), HTTP_ACCEPT_LANGUAGE=language))
+        elif rule % 4 == 3:
+            requests.append(factory.get('/static/{}'.format(rule - 1), {'sort': 'asc', 'page': rule % 10}))
+        else:
+            requests.append(factory.get('/static/{}'.format(rule)))
+    return requests
+
+
+def measure_lookups(engine, requests):
+    from django.db import reset_queries
+    from django.test.utils import override_settings
+
+    from aldryn_redirects.metrics import QueryCounter
+    from aldryn_redirects.middleware import RedirectFallbackMiddleware
+
+    middleware = RedirectFallbackMiddleware()
+    timings = []
+    queries = 0
+
+    with override_settings(ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.{}'.format(engine)):
+        started = default_timer()
+        middleware.process_request(requests[0])  # Builds snapshots
+        warm_up = default_timer() - started
+
+        for request in requests:
+            # The query log keeps the last 9000 queries only, like Django does per request.
+            reset_queries()
+            with QueryCounter() as counter:
+                started = default_timer()
+                middleware.process_request(request)
+                timings.append(default_timer() - started)
+            queries += counter.count
+
+    timings.sort()
+    return {
+        'warm_up_ms': round(warm_up * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 4),
+        'p50_ms': round(timings[len(timings) // 2] * 1000, 4),
+        'p95_ms': round(timings[int(len(timings) * 0.95)] * 1000, 4),
+        'queries_per_request': round(queries / len(requests), 3),
+    }
+
+
+def measure_export(exporter_class, queryset):
+    exporter = exporter_class()
+
+    started = default_timer()
+    for _ in exporter.export_to_csv(queryset):
+        pass
+    result = {'seconds': round(default_timer() - started, 3)}
+
+    if tracemalloc:
+        # Separate run, tracing slows the export down.
+        tracemalloc.start()
+        for _ in exporter.export_to_csv(queryset):
+            pass
+        result['peak_memory_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        tracemalloc.stop()
+    return result
+
+
+def run(rows, engines, request_count, hit_ratios):
+    from django.core.management import call_command
+
+    from aldryn_redirects.exporters import RedirectExporter, StaticRedirectExporter
+    from aldryn_redirects.importers import RedirectImporter, StaticRedirectImporter
+    from aldryn_redirects.models import Redirect, StaticRedirect
+
+    call_command('flush', interactive=False, verbosity=0)
+    results = {
+        'import': {
+            'redirect': measure_import(RedirectImporter, list(get_redirect_rows(rows))),
+            'static_redirect': measure_import(StaticRedirectImporter, list(get_static_redirect_rows(rows))),
+        },
+        'lookup': {},
+    }
+
+    for engine in engines:
+        for hit_ratio in hit_ratios:
+            requests = get_requests(request_count, rows, hit_ratio)
+            results['lookup']['{}:{}'.format(engine, hit_ratio)] = measure_lookups(engine, requests)
+
+    results['export'] = {
+        'redirect': measure_export(RedirectExporter, Redirect.objects.all()),
+        'static_redirect': measure_export(StaticRedirectExporter, StaticRedirect.objects.all()),
+    }
+    return results
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD']).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(path, key):
+    previous = None
+    if os.path.exists(path):
+        with open(path) as results_file:
+            for line in results_file:
+                entry = json.loads(line)
+                if all(entry.get(name) == value for name, value in key.items()):
+                    previous = entry
+    return previous
+
+
+def print_results(results, previous, prefix=''):
+    for name, value in sorted(results.items()):
+        old_value = (previous or {}).get(name)
+
+        if isinstance(value, dict):
+            print_results(value, old_value if isinstance(old_value, dict) else None, prefix + name + ' ')
+        elif isinstance(old_value, (int, float)) and old_value:
+            print('  {}{}: {} (was {}, {:+.1%})'.format(prefix, name, value, old_value, value / old_value - 1))
+        else:
+            print('  {}{}: {}'.format(prefix, name, value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks aldryn-redirects.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                        help='Rules of each type to generate, 10000 100000 1000000 for the full suite.')
+    parser.add_argument('--database-url', default=None,
+                        help='Database to use, such as postgres://localhost/benchmark. ALL ITS DATA IS DELETED. '
+                             'Defaults to a temporary SQLite database.')
+    parser.add_argument('--engines', nargs='+', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per engine and hit ratio.')
+    parser.add_argument('--hit-ratios', type=float, nargs='+', default=[0.0, 0.5, 1.0])
+    parser.add_argument('--output', default='benchmark-results.jsonl', help='File the results are appended to.')
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    try:
+        configure(args.database_url, directory)
+
+        from django.core.management import call_command
+        from django.db import connection
+
+        import aldryn_redirects
+
+        call_command('migrate', interactive=False, verbosity=0)
+
+        for rows in args.rows:
+            key = {
+                'rows': rows,
+                'database': connection.vendor,
+                'engines': args.engines,
+                'requests': args.requests,
+                'hit_ratios': args.hit_ratios,
+            }
+            entry = dict(
+                key,
+                version=aldryn_redirects.__version__,
+                revision=get_revision(),
+                python=sys.version.split()[0],
+                date=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                results=run(rows, args.engines, args.requests, args.hit_ratios),
+            )
+            previous = load_previous(args.output, key)
+
+            print('{rows} rules of each type on {database}:'.format(**key))
+            print_results(entry['results'], previous and previous['results'])
+
+            with open(args.output, 'a') as results_file:
+                results_file.write(json.dumps(entry, sort_keys=True) + '\n')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
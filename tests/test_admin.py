@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from aldryn_redirects.models import Redirect, StaticRedirect
+from aldryn_redirects.paginator import EstimatedCountPaginator, get_estimated_count
+
+try:
+    from django.urls import reverse
+except ImportError:  # COMPAT: Django < 1.10
+    from django.core.urlresolvers import reverse
+
+
+class ChangelistTestCase(TestCase):
+    def setUp(self):
+        super(ChangelistTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.other_site = Site.objects.create(domain='hamster.com', name='hamster')
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.force_login(user)
+
+    def create_redirects(self, count):
+        for idx in range(count):
+            redirect = Redirect.objects.create(site=self.site, old_path='/old/{}/{}'.format(count, idx))
+            redirect.translations.create(language_code='en', new_path='/new')
+            redirect.translations.create(language_code='pt-br', new_path='/novo')
+
+    def get_changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEquals(response.status_code, 200)
+        return len(queries)
+
+    def test_redirect_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:aldryn_redirects_redirect_changelist')
+        self.client.get(url)  # django CMS sets the user up on the first request
+        self.create_redirects(2)
+        queries = self.get_changelist_queries(url)
+
+        self.create_redirects(5)
+        self.assertEquals(self.get_changelist_queries(url), queries)
+
+    def test_sites_filter(self):
+        first = StaticRedirect.objects.create(inbound_route='/first', outbound_route='/dest')
+        first.sites.add(self.site, self.other_site)
+        second = StaticRedirect.objects.create(inbound_route='/second', outbound_route='/dest')
+        second.sites.add(self.other_site)
+
+        url = reverse('admin:aldryn_redirects_staticredirect_changelist')
+        response = self.client.get(url, {'sites__id__exact': self.site.pk})
+        self.assertEquals(list(response.context['cl'].result_list), [first])
+
+        response = self.client.get(url, {'sites__id__exact': self.other_site.pk})
+        self.assertEquals(response.context['cl'].result_count, 2)
+        self.assertContains(response, 'hamster.com')
+
+
+class EstimatedCountPaginatorTestCase(TestCase):
+    def test_exact_count_without_estimate(self):
+        Site.objects.create(domain='hamster.com', name='hamster')
+        queryset = Site.objects.order_by('pk')
+
+        self.assertIsNone(get_estimated_count(queryset))
+        with self.settings(ALDRYN_REDIRECTS_ESTIMATED_COUNT_THRESHOLD=0):
+            self.assertEquals(EstimatedCountPaginator(queryset, 1).count, 2)
+        self.assertEquals(EstimatedCountPaginator([1, 2, 3], 1).count, 3)
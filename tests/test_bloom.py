@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.test import SimpleTestCase
+
+from aldryn_redirects.bloom import BloomFilter
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter(capacity=1000)
+        for idx in range(1000):
+            bloom_filter.add('/path/{}'.format(idx))
+
+        for idx in range(1000):
+            self.assertIn('/path/{}'.format(idx), bloom_filter)
+
+    def test_false_positive_rate(self):
+        bloom_filter = BloomFilter(capacity=1000, false_positive_rate=0.01)
+        for idx in range(1000):
+            bloom_filter.add('/path/{}'.format(idx))
+
+        false_positives = sum('/other/{}'.format(idx) in bloom_filter for idx in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertAlmostEqual(bloom_filter.false_positive_rate, 0.01, delta=0.005)
+
+    def test_empty(self):
+        bloom_filter = BloomFilter(capacity=0)
+        self.assertNotIn('/path', bloom_filter)
+        self.assertEquals(bloom_filter.false_positive_rate, 0)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.test import SimpleTestCase
+
+from aldryn_redirects.checks import check_redirects_cache
+
+
+class RedirectsCacheCheckTestCase(SimpleTestCase):
+    def test_process_local_cache(self):
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'},
+        }
+        with self.settings(CACHES=caches):
+            self.assertEquals([warning.id for warning in check_redirects_cache()], ['aldryn_redirects.W001'])
+
+            with self.settings(ALDRYN_REDIRECTS_CACHE='shared'):
+                self.assertEquals(check_redirects_cache(), [])
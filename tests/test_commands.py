@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from six import StringIO
+
+from aldryn_redirects.models import Redirect, StaticRedirect
+
+
+class ImportExportCommandsTestCase(TestCase):
+    def setUp(self):
+        super(ImportExportCommandsTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_file(self, content):
+        path = os.path.join(self.directory, 'redirects.csv')
+        with io.open(path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write(content)
+        return path
+
+    def call_command(self, *args, **kwargs):
+        out = StringIO()
+        call_command(*args, stdout=out, stderr=StringIO(), **kwargs)
+        return out.getvalue()
+
+    def test_import(self):
+        path = self.write_file(
+            'Domain,Old,New,Language\n'
+            'example.com,/old1,/new1,en\n'
+            'example.com,/old2,/neu/ü,pt-br\n'
+        )
+
+        out = self.call_command('import_redirects', path, processes=2, chunk_size=1)
+        self.assertIn('Validated 2 rows', out)
+        self.assertIn('rows/s', out)
+        self.assertIn('2 created, 0 updated, 0 unchanged.', out)
+        self.assertEquals(Redirect.objects.count(), 2)
+
+    def test_invalid_rows_not_imported(self):
+        path = self.write_file(
+            'domain,inbound_route,outbound_route\n'
+            'example.com,/origin,/dest\n'
+            'example.com,/origin,/dest\n'
+            'unknown.domain.com,/origin,/dest\n'
+        )
+
+        for processes in (1, 2):
+            err = StringIO()
+            with self.assertRaisesMessage(CommandError, '2 invalid rows'):
+                call_command('import_redirects', path, static=True, processes=processes, stdout=StringIO(), stderr=err)
+            self.assertIn('Line 3: Row duplicated with line 2.', err.getvalue())
+        self.assertFalse(StaticRedirect.objects.exists())
+
+    def test_export(self):
+        site = Site.objects.get()
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(site)
+        redirect.query_params.create(key='key', value='value')
+        path = os.path.join(self.directory, 'export.csv')
+
+        out = self.call_command('export_redirects', path, static=True)
+        self.assertIn('Exported 1 rows', out)
+        with io.open(path, encoding='utf-8', newline='') as csv_file:
+            self.assertEquals(
+                csv_file.read(),
+                'domain,inbound_route,outbound_route\r\nexample.com,/origin?key=value,/dest\r\n',
+            )
+
+        out = self.call_command('export_redirects')
+        self.assertEquals(out, 'Domain,Old,New,Language\r\n')
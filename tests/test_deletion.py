@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from parler.cache import get_translation_cache_key
+
+from aldryn_redirects.deletion import delete_in_chunks
+from aldryn_redirects.engines import get_engine
+from aldryn_redirects.models import (
+    Redirect, RedirectTranslation, StaticRedirect, StaticRedirectInboundRouteQueryParam,
+)
+
+try:
+    from django.urls import reverse
+except ImportError:  # COMPAT: Django < 1.10
+    from django.core.urlresolvers import reverse
+
+
+class DeleteInChunksTestCase(TestCase):
+    def setUp(self):
+        super(DeleteInChunksTestCase, self).setUp()
+        self.site = Site.objects.get()
+
+    def test_static_redirects(self):
+        for idx in range(5):
+            redirect = StaticRedirect.objects.create(inbound_route='/old/{}'.format(idx), outbound_route='/new')
+            redirect.sites.add(self.site)
+            redirect.query_params.create(key='key', value='value')
+        kept = StaticRedirect.objects.create(inbound_route='/kept', outbound_route='/new')
+        kept.sites.add(self.site)
+        through = StaticRedirect.sites.through
+
+        deleted = delete_in_chunks(StaticRedirect.objects.filter(inbound_route__startswith='/old/'), chunk_size=2)
+        self.assertEquals(deleted, 5)
+        self.assertEquals(list(StaticRedirect.objects.all()), [kept])
+        self.assertFalse(StaticRedirectInboundRouteQueryParam.objects.exists())
+        self.assertEquals(through.objects.count(), 1)
+
+    def test_redirects_filtered_across_translations(self):
+        for idx in range(3):
+            redirect = Redirect.objects.create(site=self.site, old_path='/old/{}'.format(idx))
+            redirect.translations.create(language_code='en', new_path='/new/en')
+            redirect.translations.create(language_code='pt-br', new_path='/new/pt-br')
+        Redirect.objects.create(site=self.site, old_path='/kept').translations.create(
+            language_code='en', new_path='/other')
+
+        deleted = delete_in_chunks(Redirect.objects.filter(translations__new_path__startswith='/new/'))
+        self.assertEquals(deleted, 3)
+        self.assertEquals(list(Redirect.objects.values_list('old_path', flat=True)), ['/kept'])
+        self.assertEquals(RedirectTranslation.objects.count(), 1)
+
+    def test_translation_cache_cleared(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/old')
+        redirect.translations.create(language_code='en', new_path='/new')
+        self.assertEquals(Redirect.objects.language('en').get().new_path, '/new')
+        key = get_translation_cache_key(RedirectTranslation, redirect.pk, 'en')
+        self.assertIsNotNone(cache.get(key))
+
+        delete_in_chunks(Redirect.objects.all())
+        self.assertIsNone(cache.get(key))
+
+    def test_rules_invalidated(self):
+        StaticRedirect.objects.create(inbound_route='/old', outbound_route='/new').sites.add(self.site)
+        with self.settings(ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.TableEngine'):
+            request = RequestFactory().get('/old')
+            self.assertIsNotNone(get_engine().lookup(request))
+            delete_in_chunks(StaticRedirect.objects.all())
+            self.assertIsNone(get_engine().lookup(request))
+
+
+class DeletionAdminTestCase(TestCase):
+    def setUp(self):
+        super(DeletionAdminTestCase, self).setUp()
+        self.site = Site.objects.get()
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.force_login(user)
+
+        for idx in range(5):
+            route = '/{}/{}'.format('old' if idx % 2 else 'other', idx)
+            StaticRedirect.objects.create(inbound_route=route, outbound_route='/new').sites.add(self.site)
+
+    def test_delete_selected_is_not_capped(self):
+        url = reverse('admin:aldryn_redirects_staticredirect_changelist')
+
+        with self.settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=4):
+            response = self.client.post(url, {
+                'action': 'delete_selected',
+                'select_across': '1',
+                'index': '0',
+                ACTION_CHECKBOX_NAME: [StaticRedirect.objects.first().pk],
+            })
+        self.assertEquals(response.status_code, 302)
+        self.assertFalse(StaticRedirect.objects.exists())
+
+    def test_delete_matching(self):
+        url = reverse('admin:aldryn_redirects_staticredirect_delete_matching') + '?q=old'
+
+        response = self.client.get(reverse('admin:aldryn_redirects_staticredirect_changelist') + '?q=old')
+        self.assertContains(response, 'delete-matching/?q=old')
+
+        response = self.client.get(url)
+        self.assertContains(response, 'delete all 2 Static Redirects')
+        self.assertEquals(StaticRedirect.objects.count(), 5)
+
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('admin:aldryn_redirects_staticredirect_changelist') + '?q=old')
+        self.assertEquals(
+            sorted(StaticRedirect.objects.values_list('inbound_route', flat=True)),
+            ['/other/0', '/other/2', '/other/4'],
+        )
+
+    def test_delete_matching_requires_permission(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'staff', is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.post(reverse('admin:aldryn_redirects_staticredirect_delete_matching'))
+        self.assertEquals(response.status_code, 403)
+        self.assertEquals(StaticRedirect.objects.count(), 5)
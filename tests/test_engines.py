@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.sites.models import Site
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.client import RequestFactory
+
+from aldryn_redirects.engines import (
+    UNRESOLVED, CachedEngine, DatabaseEngine, FilteredEngine, TableEngine, bump_rules_version, find_redirect_loops,
+    get_engine, get_redirects_cache, get_rules_version,
+)
+from aldryn_redirects.models import PrefixRedirect, Redirect, RedirectTranslation, RegexRedirect, StaticRedirect
+
+
+@override_settings(
+    ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.TableEngine',
+    ALDRYN_REDIRECTS_REFRESH_INTERVAL=0,
+)
+class TableEngineTestCase(TestCase):
+    def setUp(self, *args, **kwargs):
+        super(TableEngineTestCase, self).setUp(*args, **kwargs)
+        self.site = Site.objects.get()
+        self.engine = get_engine()
+
+    def create_fake_request(self, url):
+        return RequestFactory().get(url)
+
+    def test_engine_from_settings(self):
+        self.assertIsInstance(self.engine, TableEngine)
+
+    def test_static_redirect(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        redirect.query_params.create(key='key1', value='value1')
+        redirect.query_params.create(key='key2', value='value2')
+
+        # Noise
+        redirect_no_params = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/other')
+        redirect_no_params.sites.add(self.site)
+
+        match = self.engine.lookup(self.create_fake_request('http://example.com/origin/?key2=value2&key1=value1'))
+        self.assertEquals(match.kind, 'static')
+        self.assertEquals(match.pk, redirect.pk)
+        self.assertEquals(match.url, 'http://example.com/dest')
+
+        match = self.engine.lookup(self.create_fake_request('http://example.com/origin'))
+        self.assertEquals(match.pk, redirect_no_params.pk)
+
+    def test_static_redirect_outbound_url(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest?keep=this')
+        redirect.sites.add(self.site)
+        absolute_redirect = StaticRedirect.objects.create(inbound_route='/away', outbound_route='http://my.cool/dest')
+        absolute_redirect.sites.add(self.site)
+
+        request = RequestFactory().get('/origin', secure=True)
+        self.assertEquals(self.engine.lookup(request).url, 'https://example.com/dest?keep=this')
+        request = RequestFactory().get('/away', secure=True)
+        self.assertEquals(self.engine.lookup(request).url, 'http://my.cool/dest')
+
+        self.site.domain = 'example.org'
+        self.site.save()
+        match = self.engine.lookup(self.create_fake_request('/origin'))
+        self.assertEquals(match.url, 'http://example.org/dest?keep=this')
+
+    def test_redirect(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/Old/')
+        redirect.translations.create(language_code='en', new_path='/new/en/')
+        redirect.translations.create(language_code='pt-br', new_path='/new/pt-br/')
+
+        match = self.engine.lookup(self.create_fake_request('http://example.com/old/'))
+        self.assertEquals(match, ('redirect', redirect.pk, '/new/en/'))
+
+        request = RequestFactory().get('http://example.com/old/', HTTP_ACCEPT_LANGUAGE='pt-br')
+        self.assertEquals(self.engine.lookup(request).url, '/new/pt-br/')
+
+    def test_redirect_gone(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/old')
+        match = self.engine.lookup(self.create_fake_request('http://example.com/old/'))
+        self.assertEquals(match, ('redirect', redirect.pk, None))
+
+    def test_prefix_redirect(self):
+        redirect = PrefixRedirect.objects.create(inbound_prefix='/old-blog', outbound_route='http://my.cool/blog')
+        redirect.sites.add(self.site)
+        PrefixRedirect.objects.create(inbound_prefix='/old-blog/news', outbound_route='/news').sites.add(self.site)
+
+        match = self.engine.lookup(self.create_fake_request('http://example.com/old-blog/post/?page=2'))
+        self.assertEquals(match, ('prefix', redirect.pk, 'http://my.cool/blog/post/?page=2'))
+
+        request = RequestFactory().get('/OLD-BLOG/News', secure=True)
+        self.assertEquals(self.engine.lookup(request).url, 'https://example.com/news')
+        self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/old-blogger')))
+
+    def test_regex_redirect(self):
+        redirect = RegexRedirect.objects.create(pattern=r'/(?P<year>\d{4})/(\w+)\.html', replacement=r'/blog/\2/')
+        redirect.sites.add(self.site)
+        RegexRedirect.objects.create(pattern=r'/news/(.*)', replacement=r'http://my.cool/\1').sites.add(self.site)
+
+        match = self.engine.lookup(self.create_fake_request('http://example.com/2017/post.html'))
+        self.assertEquals(match, ('regex', redirect.pk, 'http://example.com/blog/post/'))
+        request = self.create_fake_request('http://example.com/news/a?b=c')
+        self.assertEquals(self.engine.lookup(request).url, 'http://my.cool/a?b=c')
+        self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/2017/post.htm')))
+
+    def test_regex_redirect_stays_on_host(self):
+        RegexRedirect.objects.create(pattern=r'/legacy/(.*)', replacement=r'/\1').sites.add(self.site)
+        # Saved before replacements had to name their host.
+        RegexRedirect.objects.create(pattern=r'/news/(.*)', replacement=r'http://my.cool\1').sites.add(self.site)
+        RegexRedirect.objects.create(pattern=r'/go/(.*)', replacement=r'\1').sites.add(self.site)
+
+        for engine in (self.engine, DatabaseEngine()):
+            request = self.create_fake_request('http://example.com/legacy//evil.com/x')
+            self.assertEquals(engine.lookup(request).url, 'http://example.com/evil.com/x')
+            request = self.create_fake_request('http://example.com/legacy/%5C%5Cevil.com')
+            self.assertEquals(engine.lookup(request).url, 'http://example.com/%5C%5Cevil.com')
+            request = self.create_fake_request('http://example.com/news/.evil.com/x')
+            self.assertIsNone(engine.lookup(request))
+            request = self.create_fake_request('http://example.com/go//evil.com')
+            self.assertEquals(engine.lookup(request).url, 'http://example.com/evil.com')
+
+    def test_chain_flattened(self):
+        first = StaticRedirect.objects.create(inbound_route='/a', outbound_route='/b')
+        first.sites.add(self.site)
+        redirect = Redirect.objects.create(site=self.site, old_path='/b')
+        redirect.translations.create(language_code='en', new_path='/c')
+        redirect.translations.create(language_code='pt-br', new_path='http://my.cool/c')
+        PrefixRedirect.objects.create(inbound_prefix='/c', outbound_route='/d').sites.add(self.site)
+        Redirect.objects.create(site=self.site, old_path='/d')  # Gone
+
+        match = self.engine.resolve(self.create_fake_request('/a'))
+        self.assertEquals(match, ('static', first.pk, 'http://example.com/d'))  # /d answers with a 410
+        request = RequestFactory().get('/a', HTTP_ACCEPT_LANGUAGE='pt-br')
+        self.assertEquals(self.engine.resolve(request).url, 'http://my.cool/c')
+
+        with self.settings(ALDRYN_REDIRECTS_MAX_CHAIN_DEPTH=0):
+            self.assertEquals(get_engine().resolve(self.create_fake_request('/a')).url, 'http://example.com/b')
+
+    def test_loop_not_flattened(self):
+        first = StaticRedirect.objects.create(inbound_route='/a', outbound_route='/b')
+        first.sites.add(self.site)
+        StaticRedirect.objects.create(inbound_route='/b', outbound_route='/c').sites.add(self.site)
+        StaticRedirect.objects.create(inbound_route='/c', outbound_route='/b').sites.add(self.site)
+
+        self.assertEquals(self.engine.resolve(self.create_fake_request('/a')).url, 'http://example.com/b')
+
+    def test_find_redirect_loops(self):
+        StaticRedirect.objects.create(inbound_route='/a', outbound_route='/b').sites.add(self.site)
+        second = StaticRedirect.objects.create(inbound_route='/b', outbound_route='/c')
+        second.sites.add(self.site)
+        redirect = Redirect.objects.create(site=self.site, old_path='/c')
+        redirect.translations.create(language_code='en', new_path='/b/')
+        redirect.translations.create(language_code='pt-br', new_path='/d')
+
+        loops = find_redirect_loops(self.site.pk)
+        self.assertEquals(len(loops), 1)
+        self.assertEquals(
+            sorted(loops[0]),
+            [('redirect', redirect.pk, '/b/'), ('static', second.pk, 'http://example.com/c')],
+        )
+
+    def test_miss_without_queries(self):
+        Redirect.objects.create(site=self.site, old_path='/old')
+        self.engine.lookup(self.create_fake_request('http://example.com/xxx'))  # Builds the table
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/xxx')))
+            self.assertIsNotNone(self.engine.lookup(self.create_fake_request('http://example.com/old')))
+
+    def test_resolve_nowait(self):
+        StaticRedirect.objects.create(inbound_route='/a', outbound_route='/b').sites.add(self.site)
+        StaticRedirect.objects.create(inbound_route='/b', outbound_route='/c').sites.add(self.site)
+        request = self.create_fake_request('http://example.com/a')
+        self.assertIs(self.engine.resolve_nowait(request), UNRESOLVED)
+
+        with self.settings(ALDRYN_REDIRECTS_REFRESH_INTERVAL=60):
+            engine = get_engine()
+            self.assertIs(engine.resolve_nowait(request), UNRESOLVED)  # Not built yet
+            engine.resolve(request)
+
+            with self.assertNumQueries(0):
+                self.assertEquals(engine.resolve_nowait(request).url, 'http://example.com/c')
+                self.assertIsNone(engine.resolve_nowait(self.create_fake_request('http://example.com/xxx')))
+
+    def test_rule_changes_rebuild_table(self):
+        request = self.create_fake_request('http://example.com/origin')
+        self.assertIsNone(self.engine.lookup(request))
+
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        self.assertEquals(self.engine.lookup(request).pk, redirect.pk)
+
+        redirect.query_params.create(key='key1', value='value1')
+        self.assertIsNone(self.engine.lookup(request))
+
+        redirect.delete()
+        self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/origin?key1=value1')))
+
+
+@override_settings(ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.CachedEngine')
+class CachedEngineTestCase(TestCase):
+    def setUp(self, *args, **kwargs):
+        super(CachedEngineTestCase, self).setUp(*args, **kwargs)
+        get_redirects_cache().clear()
+        self.site = Site.objects.get()
+        self.engine = get_engine()
+
+    def create_fake_request(self, url):
+        return RequestFactory().get(url)
+
+    def test_miss_is_cached(self):
+        request = self.create_fake_request('http://example.com/origin?key1=value1')
+        self.assertIsNone(self.engine.lookup(request))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.engine.lookup(request))
+
+    def test_chain_flattened(self):
+        StaticRedirect.objects.create(inbound_route='/a', outbound_route='/b').sites.add(self.site)
+        StaticRedirect.objects.create(inbound_route='/b', outbound_route='/c').sites.add(self.site)
+        request = self.create_fake_request('http://example.com/a')
+
+        self.assertEquals(self.engine.resolve(request).url, 'http://example.com/c')
+        with self.assertNumQueries(0):
+            self.assertEquals(self.engine.resolve(request).url, 'http://example.com/c')
+        self.assertEquals(DatabaseEngine().resolve(request).url, 'http://example.com/b')
+
+    def test_hit_is_cached(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        request = self.create_fake_request('http://example.com/origin')
+        self.assertEquals(self.engine.lookup(request), ('static', redirect.pk, 'http://example.com/dest'))
+
+        with self.assertNumQueries(0):
+            self.assertEquals(self.engine.lookup(request), ('static', redirect.pk, 'http://example.com/dest'))
+
+    def test_language_is_part_of_the_key(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/old')
+        redirect.translations.create(language_code='en', new_path='/new/en')
+        redirect.translations.create(language_code='pt-br', new_path='/new/pt-br')
+        request = self.create_fake_request('http://example.com/old')
+
+        self.assertEquals(self.engine.lookup(request).url, '/new/en')
+        request = RequestFactory().get('http://example.com/old', HTTP_ACCEPT_LANGUAGE='pt-br')
+        self.assertEquals(self.engine.lookup(request).url, '/new/pt-br')
+
+    def test_rule_changes_invalidate_entries(self):
+        request = self.create_fake_request('http://example.com/old')
+        self.assertIsNone(self.engine.lookup(request))
+
+        redirect = Redirect.objects.create(site=self.site, old_path='/old')
+        self.assertEquals(self.engine.lookup(request).url, None)
+
+        redirect.translations.create(language_code='en', new_path='/new')
+        self.assertEquals(self.engine.lookup(request).url, '/new')
+
+        redirect.delete()
+        self.assertIsNone(self.engine.lookup(request))
+
+    def test_entries_of_older_versions_ignored(self):
+        engine = CachedEngine()
+        request = self.create_fake_request('http://example.com/old')
+        self.assertIsNone(engine.lookup(request))
+
+        # Bulk queries send no signals, the cached miss stays.
+        Redirect.objects.bulk_create([Redirect(site=self.site, old_path='/old', old_path_key='/old')])
+        RedirectTranslation.objects.bulk_create([RedirectTranslation(
+            master=Redirect.objects.get(), language_code='en', new_path='/new',
+        )])
+        self.assertIsNone(engine.lookup(request))
+
+        bump_rules_version()
+        self.assertEquals(engine.lookup(request).url, '/new')
+
+
+class InvalidationTestCase(TransactionTestCase):
+    def test_rules_invalidated_again_on_commit(self):
+        with transaction.atomic():
+            Redirect.objects.create(site=Site.objects.get(), old_path='/old')
+            version = get_rules_version()
+        # Entries cached before the commit, under that version, are dropped.
+        self.assertNotEquals(get_rules_version(), version)
+
+
+@override_settings(
+    ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.FilteredEngine',
+    ALDRYN_REDIRECTS_REFRESH_INTERVAL=0,
+)
+class FilteredEngineTestCase(TestCase):
+    def setUp(self, *args, **kwargs):
+        super(FilteredEngineTestCase, self).setUp(*args, **kwargs)
+        get_redirects_cache().clear()
+        self.site = Site.objects.get()
+        self.engine = get_engine()
+
+    def create_fake_request(self, url):
+        return RequestFactory().get(url)
+
+    def test_misses_skip_lookup(self):
+        Redirect.objects.create(site=self.site, old_path='/old?key1=value1')
+        redirect = StaticRedirect.objects.create(inbound_route='/Origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        self.engine.lookup(self.create_fake_request('http://example.com/xxx'))  # Builds the filter
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/xxx')))
+
+        match = self.engine.lookup(self.create_fake_request('http://example.com/Origin/'))
+        self.assertEquals(match.pk, redirect.pk)
+        match = self.engine.lookup(self.create_fake_request('http://example.com/OLD?key1=value1'))
+        self.assertEquals(match.kind, 'redirect')
+
+    def test_prefix_redirects_pass(self):
+        redirect = PrefixRedirect.objects.create(inbound_prefix='/old-blog', outbound_route='/blog')
+        redirect.sites.add(self.site)
+        self.engine.lookup(self.create_fake_request('http://example.com/xxx'))  # Builds the filter
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/old-blogger')))
+        match = self.engine.lookup(self.create_fake_request('http://example.com/old-blog/post'))
+        self.assertEquals(match, ('prefix', redirect.pk, 'http://example.com/blog/post'))
+
+    def test_regex_redirects_pass(self):
+        redirect = RegexRedirect.objects.create(pattern=r'/product\.php\?id=(\d+)', replacement=r'/products/\1')
+        redirect.sites.add(self.site)
+        self.engine.lookup(self.create_fake_request('http://example.com/xxx'))  # Builds the filter
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.engine.lookup(self.create_fake_request('http://example.com/product.php?id=x')))
+        match = self.engine.lookup(self.create_fake_request('http://example.com/product.php?id=42'))
+        self.assertEquals(match, ('regex', redirect.pk, 'http://example.com/products/42'))
+
+    def test_encoded_paths_pass(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/my%20page')
+        redirect.translations.create(language_code='en', new_path='/new')
+        static_redirect = StaticRedirect.objects.create(inbound_route='/caf\xe9', outbound_route='/dest')
+        static_redirect.sites.add(self.site)
+
+        self.assertEquals(self.engine.lookup(self.create_fake_request('/my%20page')).url, '/new')
+        self.assertEquals(self.engine.lookup(self.create_fake_request('/caf%C3%A9')).pk, static_redirect.pk)
+
+    def test_resolve_nowait(self):
+        StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest').sites.add(self.site)
+
+        with self.settings(ALDRYN_REDIRECTS_REFRESH_INTERVAL=60):
+            engine = get_engine()
+            engine.resolve(self.create_fake_request('http://example.com/xxx'))  # Builds the filter
+
+            with self.assertNumQueries(0):
+                self.assertIsNone(engine.resolve_nowait(self.create_fake_request('http://example.com/xxx')))
+                request = self.create_fake_request('http://example.com/origin')
+                self.assertIs(engine.resolve_nowait(request), UNRESOLVED)
+            self.assertEquals(engine.resolve(request).pk, StaticRedirect.objects.get().pk)
+
+    def test_rule_changes_rebuild_filter(self):
+        request = self.create_fake_request('http://example.com/origin')
+        self.assertIsNone(self.engine.lookup(request))
+
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        self.assertEquals(self.engine.lookup(request).pk, redirect.pk)
+
+    def test_stats(self):
+        self.engine = FilteredEngine()
+        StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest').sites.add(self.site)
+        self.engine.lookup(self.create_fake_request('http://example.com/xxx'))
+        self.engine.lookup(self.create_fake_request('http://example.com/origin'))
+        self.engine.lookup(self.create_fake_request('http://example.com/origin?key1=value1'))
+
+        stats = self.engine.get_stats()
+        self.assertEquals(stats['rejected'], 1)
+        self.assertEquals(stats['passed'], 2)
+        self.assertEquals(stats['false_positives'], 1)
+        self.assertEquals(stats['observed_false_positive_rate'], 0.5)
+        self.assertLess(stats['estimated_false_positive_rate'], 0.02)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.sites.models import Site
+from django.test import TestCase
+
+from aldryn_redirects.exporters import RedirectExporter, StaticRedirectExporter
+from aldryn_redirects.models import Redirect, StaticRedirect
+
+
+class RedirectExporterTestCase(TestCase):
+    def setUp(self):
+        super(RedirectExporterTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.exporter = RedirectExporter()
+        self.exporter.chunk_size = 2
+
+    def test_export_to_csv(self):
+        for idx in range(5):
+            redirect = Redirect.objects.create(site=self.site, old_path='/old{}'.format(idx))
+            redirect.translations.create(language_code='en', new_path='/new{}'.format(idx))
+        redirect.translations.create(language_code='pt-br', new_path='/novo4')
+        Redirect.objects.create(site=self.site, old_path='/gone')  # No translations, not exported
+
+        # Per chunk one query for redirects and one for translations,
+        # then one query finding no more redirects.
+        with self.assertNumQueries(7):
+            csv = ''.join(self.exporter.export_to_csv(Redirect.objects.all()))
+
+        self.assertEquals(csv.splitlines(), [
+            'Domain,Old,New,Language',
+            'example.com,/old0,/new0,en',
+            'example.com,/old1,/new1,en',
+            'example.com,/old2,/new2,en',
+            'example.com,/old3,/new3,en',
+            'example.com,/old4,/new4,en',
+            'example.com,/old4,/novo4,pt-br',
+        ])
+
+    def test_export_to_csv_empty(self):
+        csv = ''.join(self.exporter.export_to_csv(Redirect.objects.all()))
+        self.assertEquals(csv.splitlines(), ['Domain,Old,New,Language'])
+
+
+class StaticRedirectExporterTestCase(TestCase):
+    def setUp(self):
+        super(StaticRedirectExporterTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.another_site = Site.objects.create(domain='hamster.com', name='hamster')
+        self.exporter = StaticRedirectExporter()
+        self.exporter.chunk_size = 2
+
+    def test_export_to_csv(self):
+        for idx in range(3):
+            redirect = StaticRedirect.objects.create(inbound_route='/old{}'.format(idx), outbound_route='/new')
+            redirect.sites.add(self.site)
+            redirect.query_params.create(key='key', value=idx)
+        redirect.sites.add(self.another_site)
+
+        # Per chunk one query for redirects, one for sites and one for query params.
+        with self.assertNumQueries(7):
+            csv = ''.join(self.exporter.export_to_csv(StaticRedirect.objects.all()))
+
+        self.assertEquals(csv.splitlines(), [
+            'domain,inbound_route,outbound_route',
+            'example.com,/old0?key=0,/new',
+            'example.com,/old1?key=1,/new',
+            'example.com,/old2?key=2,/new',
+            'hamster.com,/old2?key=2,/new',
+        ])
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.sites.models import Site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from aldryn_redirects.forms import RedirectsImportForm, StaticRedirectsImportForm
+from aldryn_redirects.models import Redirect, StaticRedirect
+
+
+class RedirectsImportFormTestCase(TestCase):
+    def create_form(self, content, form_class=RedirectsImportForm):
+        csv_file = SimpleUploadedFile('redirects.csv', content.encode('utf-8'), content_type='text/csv')
+        return form_class(data={}, files={'csv_file': csv_file})
+
+    def test_import(self):
+        form = self.create_form(
+            'Domain,Old,New,Language\r\n'
+            'example.com, /old ,/new,en\r\n'
+            '\r\n'
+            'example.com,/old,/neu/ü,pt-br\r\n'
+        )
+
+        self.assertTrue(form.is_valid())
+        self.assertEquals(form.do_import(), {'created': 2, 'updated': 0, 'unchanged': 0})
+        redirect = Redirect.objects.get()
+        self.assertEquals(redirect.old_path, '/old')
+        self.assertEquals(
+            sorted(redirect.translations.values_list('language_code', 'new_path')),
+            [('en', '/new'), ('pt-br', '/neu/ü')],
+        )
+
+    def test_import_in_chunks(self):
+        form = self.create_form(
+            'Domain,Old,New,Language\n'
+            'example.com,/old,/new,en\n'
+            'example.com,/other,/new,en\n'
+            'example.com,/old,/novo,pt-br\n'
+        )
+        form.importer.chunk_size = 1
+
+        self.assertTrue(form.is_valid())
+        self.assertEquals(form.do_import(), {'created': 3, 'updated': 0, 'unchanged': 0})
+        self.assertEquals(Redirect.objects.count(), 2)
+        self.assertEquals(Redirect.objects.get(old_path='/old').translations.count(), 2)
+
+    def test_all_errors_reported(self):
+        form = self.create_form(
+            'Domain,Old,New,Language\n'
+            'unknown.domain.com,/old,/new,en\n'
+            'example.com,/old,/new,en\n'
+            'example.com,/old,/new,de\n'
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertEquals(len(form.errors['csv_file']), 2)
+        self.assertTrue(form.errors['csv_file'][0].startswith('Line 2: '))
+        self.assertTrue(form.errors['csv_file'][1].startswith('Line 4: '))
+
+    def test_invalid_encoding(self):
+        csv_file = SimpleUploadedFile('redirects.csv', 'Domain\nexample.com,/ü'.encode('latin-1'))
+        form = RedirectsImportForm(data={}, files={'csv_file': csv_file})
+        self.assertFalse(form.is_valid())
+
+    def test_static_import(self):
+        Site.objects.create(domain='hamster.com', name='hamster')
+        form = self.create_form(
+            'domain,inbound_route,outbound_route\n'
+            'example.com,/origin?key=value,/dest\n'
+            'hamster.com,/origin?key=value,/dest\n',
+            form_class=StaticRedirectsImportForm,
+        )
+
+        self.assertTrue(form.is_valid())
+        form.do_import()
+        redirect = StaticRedirect.objects.get()
+        self.assertEquals(redirect.get_full_inbound_route(), '/origin?key=value')
+        self.assertEquals(redirect.sites.count(), 2)
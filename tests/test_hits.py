@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+
+from aldryn_redirects.engines import Match
+from aldryn_redirects.hits import HitCounter, hit_counter
+from aldryn_redirects.middleware import RedirectFallbackMiddleware
+from aldryn_redirects.models import Redirect, StaticRedirect
+
+
+class HitCounterTestCase(TestCase):
+    def setUp(self):
+        super(HitCounterTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.counter = HitCounter()
+
+    def test_flush(self):
+        redirect1 = Redirect.objects.create(site=self.site, old_path='/old1')
+        redirect2 = Redirect.objects.create(site=self.site, old_path='/old2')
+        redirect3 = Redirect.objects.create(site=self.site, old_path='/old3')
+        static_redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+
+        for match in [
+            Match('redirect', redirect1.pk, '/new'),
+            Match('redirect', redirect1.pk, '/new'),
+            Match('redirect', redirect2.pk, '/new'),
+            Match('redirect', redirect3.pk, '/new'),
+            Match('static', static_redirect.pk, '/dest'),
+            Match('prefix', 1, '/dest'),
+        ]:
+            self.counter.record(match)
+
+        # One update per kind and number of hits.
+        with self.assertNumQueries(3):
+            self.assertEquals(self.counter.flush(), 4)
+        self.counter.record(Match('redirect', redirect1.pk, '/new'))
+        self.counter.flush()
+
+        self.assertEquals(
+            list(Redirect.objects.order_by('pk').values_list('hit_count', flat=True)),
+            [3, 1, 1],
+        )
+        static_redirect.refresh_from_db()
+        self.assertEquals(static_redirect.hit_count, 1)
+        self.assertIsNotNone(static_redirect.last_hit_at)
+
+        with self.assertNumQueries(0):
+            self.assertEquals(self.counter.flush(), 0)
+
+    def test_middleware_does_not_write(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        hit_counter.flush()
+        request = RequestFactory().get('http://example.com/origin')
+        Site.objects.get_current()
+
+        with self.assertNumQueries(2):  # The lookups only
+            RedirectFallbackMiddleware().process_request(request)
+            RedirectFallbackMiddleware().process_request(request)
+
+        hit_counter.flush()
+        redirect.refresh_from_db()
+        self.assertEquals(redirect.hit_count, 2)
+
+        with override_settings(ALDRYN_REDIRECTS_COUNT_HITS=False):
+            RedirectFallbackMiddleware().process_request(request)
+        hit_counter.flush()
+        redirect.refresh_from_db()
+        self.assertEquals(redirect.hit_count, 2)
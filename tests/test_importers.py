@@ -4,9 +4,11 @@ from __future__ import unicode_literals, print_function, division
 from django.contrib.sites.models import Site
 from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.test.client import RequestFactory
+from tablib import Dataset
 
-from aldryn_redirects.importers import RedirectImporter
-from aldryn_redirects.models import Redirect
+from aldryn_redirects.importers import RedirectImporter, StaticRedirectImporter
+from aldryn_redirects.models import Redirect, StaticRedirect
 
 
 class RedirectImporterGetExistingRedirectsTestCase(TestCase):
@@ -92,3 +94,126 @@ class RedirectImporterValidateRowTestCase(TestCase):
     def test_language_code_invalid(self):
         self.row[3] = 'de'  # Not declared as a language in our tests/settings.py
         self.assertRaises(ValidationError, self.validate_row, self.row)
+
+
+class RedirectImporterImportFromDatasetTestCase(TestCase):
+    def setUp(self):
+        super(RedirectImporterImportFromDatasetTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.importer = RedirectImporter(chunk_size=2)
+
+    def test_import(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/Old0')
+        redirect.translations.create(language_code='en', new_path='/new0')
+        redirect.translations.create(language_code='pt-br', new_path='/changed')
+
+        dataset = Dataset(headers=['Domain', 'Old', 'New', 'Language'])
+        dataset.extend([
+            [self.site.domain, '/old0', '/new0', 'en'],
+            [self.site.domain, '/old0', '/novo0', 'pt-br'],
+            [self.site.domain, '/old1', '/new1', 'en'],
+            [self.site.domain, '/old2', '/new2', 'en'],
+            [self.site.domain, '/old2', '/novo2', 'pt-br'],
+        ])
+        result = self.importer.import_from_dataset(dataset)
+
+        self.assertEquals(result, {'created': 3, 'updated': 1, 'unchanged': 1})
+        self.assertEquals(
+            sorted(Redirect.objects.values_list('old_path', 'translations__language_code', 'translations__new_path')),
+            [
+                ('/Old0', 'en', '/new0'),
+                ('/Old0', 'pt-br', '/novo0'),
+                ('/old1', 'en', '/new1'),
+                ('/old2', 'en', '/new2'),
+                ('/old2', 'pt-br', '/novo2'),
+            ]
+        )
+        self.assertEquals(Redirect.objects.get(old_path='/old1').old_path_key, '/old1')
+
+    def test_queries_per_chunk(self):
+        dataset = Dataset()
+        dataset.extend([[self.site.domain, '/old{}'.format(idx), '/new', 'en'] for idx in range(10)])
+
+        with self.assertNumQueries(36):  # Sites, then 7 for each of the 5 chunks (savepoints included)
+            self.importer.import_from_dataset(dataset)
+        self.assertEquals(Redirect.objects.count(), 10)
+
+
+class StaticRedirectImporterImportFromDatasetTestCase(TestCase):
+    def setUp(self):
+        super(StaticRedirectImporterImportFromDatasetTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.another_site = Site.objects.create(domain='hamster.com', name='hamster')
+        self.importer = StaticRedirectImporter(chunk_size=2)
+
+    def test_import(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        redirect.query_params.create(key='key1', value='value1')
+
+        dataset = Dataset()
+        dataset.extend([
+            [self.site.domain, '/origin?key1=value1', '/dest'],
+            [self.another_site.domain, '/origin?key1=value1', '/dest'],
+            [self.site.domain, '/origin?key1=value2', '/dest'],
+            [self.another_site.domain, '/origin?key1=value2', '/dest'],
+            [self.site.domain, '/origin', '/dest'],
+        ])
+        result = self.importer.import_from_dataset(dataset)
+
+        self.assertEquals(result, {'created': 2, 'updated': 1, 'unchanged': 1})
+        self.assertEquals(StaticRedirect.objects.count(), 3)
+        self.assertEquals(set(redirect.sites.all()), {self.site, self.another_site})
+
+        new_redirect = StaticRedirect.objects.get(query_params__value='value2')
+        self.assertEquals(set(new_redirect.sites.all()), {self.site, self.another_site})
+        self.assertEquals(new_redirect.get_full_inbound_route(), '/origin?key1=value2')
+
+        request = RequestFactory().get('http://example.com/origin?key1=value2')
+        self.assertEquals(StaticRedirect.objects.get_for_request(request), new_redirect)
+        request = RequestFactory().get('http://example.com/origin')
+        self.assertIsNotNone(StaticRedirect.objects.get_for_request(request))
+
+    def test_queries_per_chunk(self):
+        dataset = Dataset()
+        dataset.extend([[self.site.domain, '/origin{}?key=value'.format(idx), '/dest'] for idx in range(10)])
+
+        with self.assertNumQueries(40):  # 8 for each of the 5 chunks (savepoints included)
+            self.importer.import_from_dataset(dataset)
+        self.assertEquals(StaticRedirect.objects.filter(sites=self.site).count(), 10)
+
+
+class StaticRedirectImporterValidateDatasetTestCase(TestCase):
+    def setUp(self):
+        super(StaticRedirectImporterValidateDatasetTestCase, self).setUp()
+        self.site = Site.objects.get()
+        self.importer = StaticRedirectImporter()
+
+    def test_validate_dataset(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        redirect.query_params.create(key='key1', value='value1')
+
+        dataset = Dataset()
+        dataset.extend([
+            [self.site.domain, '/origin?key1=value1', '/dest'],
+            [self.site.domain, '/origin?key1=value2', '/dest'],
+            ['unknown.domain.com', '/origin', '/dest'],
+            [self.site.domain, '/origin?key1=value2', '/dest'],
+            [self.site.domain, '/origin', '/dest'],
+        ])
+
+        with self.assertNumQueries(1):
+            errors = self.importer.validate_dataset(dataset)
+
+        self.assertEquals(list(errors.keys()), [2, 4, 5])
+        self.assertIn(redirect.get_admin_change_url(), errors[2][0])
+        self.assertEquals(errors[4], ['domain not found.'])
+        self.assertEquals(errors[5], ['Row duplicated with line 3.'])
+
+    def test_validate_row_duplicated(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+
+        self.importer.validate_row([self.site.domain, '/origin?key1=value1', '/dest'])  # Nothing raised
+        self.assertRaises(ValidationError, self.importer.validate_row, [self.site.domain, '/origin', '/dest'])
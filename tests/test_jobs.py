@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from datetime import timedelta
+
+from django.contrib.sites.models import Site
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from six import StringIO
+
+from aldryn_redirects.importers import RedirectImporter
+from aldryn_redirects.jobs import ImportJobRunner
+from aldryn_redirects.models import ImportJob, Redirect, StaticRedirect
+
+
+class ImportJobRunnerTestCase(TestCase):
+    def create_job(self, content, kind=ImportJob.REDIRECT, **kwargs):
+        job = ImportJob(kind=kind, **kwargs)
+        job.csv_file.save('redirects.csv', ContentFile(content.encode('utf-8')))
+        return job
+
+    def test_import(self):
+        job = self.create_job(
+            'Domain,Old,New,Language\n'
+            'example.com,/old1,/new1,en\n'
+            'example.com,/old2,/new2,en\n'
+            'example.com,/old3,/new3,en\n'
+        )
+
+        self.assertEquals(ImportJobRunner(chunk_size=2).run_pending(), [job])
+        job.refresh_from_db()
+        self.assertEquals(job.status, ImportJob.DONE)
+        self.assertEquals((job.total_rows, job.processed_rows), (3, 3))
+        self.assertEquals(job.created_count, 3)
+        self.assertEquals(job.get_progress(), 100)
+        self.assertEquals(Redirect.objects.count(), 3)
+
+    def test_resume(self):
+        job = self.create_job(
+            'Domain,Old,New,Language\n'
+            'example.com,/old1,/new1,en\n'
+            'example.com,/old2,/new2,en\n',
+            status=ImportJob.RUNNING, total_rows=2, processed_rows=1, created_count=1,
+        )
+        # Crashed runner, the job stopped reporting progress.
+        ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        ImportJobRunner().run_pending()
+        job.refresh_from_db()
+        self.assertEquals(job.status, ImportJob.DONE)
+        self.assertEquals((job.processed_rows, job.created_count), (2, 2))
+        self.assertEquals(list(Redirect.objects.values_list('old_path', flat=True)), ['/old2'])
+
+    def test_heartbeat(self):
+        job = self.create_job(
+            'Domain,Old,New,Language\n'
+            'example.com,/old1,/new1,en\n'
+            'example.com,/old2,/new2,en\n'
+        )
+        runner = ImportJobRunner(chunk_size=1)
+        job = runner.claim_next_job()
+        claimed_at = job.updated_at
+
+        with self.settings(ALDRYN_REDIRECTS_IMPORT_JOB_TIMEOUT=0):
+            # Progress is reported for every row validated.
+            self.assertTrue(runner.validate(job, RedirectImporter()))
+        job.refresh_from_db()
+        self.assertGreater(job.updated_at, claimed_at)
+        self.assertEquals(job.total_rows, 2)
+
+    def test_reclaimed_job_left_to_other_runner(self):
+        content = (
+            'Domain,Old,New,Language\n'
+            'example.com,/old1,/new1,en\n'
+            'example.com,/old2,/new2,en\n'
+        )
+        runner = ImportJobRunner(chunk_size=1)
+
+        # Stopped after validation, then after the first chunk, which is rolled back.
+        for total_rows in (None, 2):
+            ImportJob.objects.all().delete()
+            self.create_job(content, total_rows=total_rows)
+            job = runner.claim_next_job()
+            # Another runner claimed the job after it stopped reporting progress.
+            ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+
+            runner.run(job)
+            job.refresh_from_db()
+            self.assertEquals(job.status, ImportJob.RUNNING)
+            self.assertEquals((job.total_rows, job.processed_rows), (total_rows, 0))
+            self.assertFalse(Redirect.objects.exists())
+
+    def test_running_job_not_claimed(self):
+        self.create_job('Domain,Old,New,Language\n', status=ImportJob.RUNNING)
+        self.assertIsNone(ImportJobRunner().claim_next_job())
+
+    def test_invalid_file(self):
+        job = self.create_job(
+            'domain,inbound_route,outbound_route\n'
+            'example.com,/origin,/dest\n'
+            'unknown.domain.com,/origin,/dest\n',
+            kind=ImportJob.STATIC_REDIRECT,
+        )
+
+        ImportJobRunner().run_pending()
+        job.refresh_from_db()
+        self.assertEquals(job.status, ImportJob.FAILED)
+        self.assertTrue(job.errors.startswith('Line 3: '))
+        self.assertIsNone(job.total_rows)
+        self.assertFalse(StaticRedirect.objects.exists())
+
+    def test_command(self):
+        Site.objects.create(domain='hamster.com', name='hamster')
+        self.create_job(
+            'domain,inbound_route,outbound_route\n'
+            'example.com,/origin?key=value,/dest\n'
+            'hamster.com,/origin?key=value,/dest\n',
+            kind=ImportJob.STATIC_REDIRECT,
+        )
+
+        out = StringIO()
+        call_command('process_redirect_import_jobs', stdout=out)
+        self.assertIn('done (2/2 rows)', out.getvalue())
+        self.assertEquals(StaticRedirect.objects.get().sites.count(), 2)
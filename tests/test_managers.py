@@ -83,3 +83,24 @@ class StaticRedirectManagerTestCase(TestCase):
 
         request = self.create_fake_request('http://example.com/origin?key1')
         self.assertEquals(StaticRedirect.objects.get_for_request(request), redirect)
+
+    def test_get_for_request_uses_a_single_query(self):
+        for value in range(10):
+            redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+            redirect.sites.add(self.site)
+            redirect.query_params.create(key='key1', value=value)
+
+        request = self.create_fake_request('http://example.com/origin?key1=9')
+        with self.assertNumQueries(1):
+            self.assertEquals(StaticRedirect.objects.get_for_request(request), redirect)
+
+    def test_get_for_request_follows_query_params_changes(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        query_param = redirect.query_params.create(key='key1', value='value1')
+
+        request = self.create_fake_request('http://example.com/origin')
+        self.assertIsNone(StaticRedirect.objects.get_for_request(request))
+
+        query_param.delete()
+        self.assertEquals(StaticRedirect.objects.get_for_request(request), redirect)
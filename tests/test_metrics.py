@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+
+from aldryn_redirects.metrics import CallbackSink, MemorySink, NullSink, QueryCounter, get_sink
+from aldryn_redirects.middleware import RedirectFallbackMiddleware
+from aldryn_redirects.models import Redirect, StaticRedirect
+
+
+collected = []
+
+
+def collect(type, name, value):
+    collected.append((type, name))
+
+
+@override_settings(ALDRYN_REDIRECTS_METRICS_SINK='aldryn_redirects.metrics.MemorySink')
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        super(MetricsTestCase, self).setUp()
+        self.site = Site.objects.get()
+        cache.clear()  # parler caches translations by primary key
+        Site.objects.get_current()
+        if isinstance(get_sink(), MemorySink):
+            get_sink().reset()
+
+    def process_request(self, url):
+        return RedirectFallbackMiddleware().process_request(RequestFactory().get(url))
+
+    def test_memory_sink(self):
+        StaticRedirect.objects.create(inbound_route='/origin', outbound_route='/dest').sites.add(self.site)
+        redirect = Redirect.objects.create(site=self.site, old_path='/old')
+        redirect.translations.create(language_code='en', new_path='/new')
+        Redirect.objects.create(site=self.site, old_path='/gone')
+
+        self.process_request('http://example.com/origin')
+        self.process_request('http://example.com/old')
+        self.process_request('http://example.com/gone')
+        self.process_request('http://example.com/xxx')
+        self.process_request('http://example.com/xxx')
+
+        sink = get_sink()
+        self.assertIsInstance(sink, MemorySink)
+        metrics = sink.get_metrics()
+        self.assertEquals(metrics['counters'], {
+            'lookups.static': 1,
+            'lookups.redirect': 1,
+            'lookups.gone': 1,
+            'lookups.miss': 2,
+        })
+
+        histograms = metrics['histograms']
+        self.assertEquals(histograms['lookup_seconds.miss']['count'], 2)
+        self.assertEquals(histograms['lookup_seconds.miss']['buckets'][-1], (float('inf'), 2))
+        self.assertEquals(histograms['static_query_seconds']['count'], 5)
+        self.assertEquals(histograms['redirect_query_seconds']['count'], 4)
+        # The static redirect is found with a single query.
+        self.assertEquals(histograms['lookup_queries']['buckets'][:2], [(0, 0), (1, 1)])
+
+    @override_settings(ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.CachedEngine')
+    def test_cache_ratio(self):
+        self.process_request('http://example.com/xxx')
+        self.process_request('http://example.com/xxx')
+        self.assertEquals(get_sink().get_metrics()['counters']['cache.hits'], 1)
+        self.assertEquals(get_sink().get_metrics()['counters']['cache.misses'], 1)
+
+    @override_settings(ALDRYN_REDIRECTS_METRICS_SINK='tests.test_metrics.collect')
+    def test_callback_sink(self):
+        del collected[:]
+        self.assertIsInstance(get_sink(), CallbackSink)
+        self.process_request('http://example.com/xxx')
+        self.assertIn(('counter', 'lookups.miss'), collected)
+        self.assertIn(('histogram', 'lookup_seconds.miss'), collected)
+
+    @override_settings(ALDRYN_REDIRECTS_METRICS_SINK=None)
+    def test_disabled(self):
+        self.assertIsInstance(get_sink(), NullSink)
+        self.assertIsNone(self.process_request('http://example.com/xxx'))
+
+    def test_query_counter_with_full_log(self):
+        self.addCleanup(reset_queries)
+        for _ in range(connection.queries_log.maxlen):
+            connection.queries_log.append({'sql': '', 'time': '0'})
+
+        with QueryCounter() as queries:
+            Site.objects.count()
+            Site.objects.count()
+        self.assertEquals(queries.count, 2)
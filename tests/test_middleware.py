@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, print_function, division
 
+import sys
+from unittest import skipIf
+
+import django
 from django.contrib.sites.models import Site
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
 from django.test.client import RequestFactory
 
+from aldryn_redirects.metrics import get_sink
 from aldryn_redirects.middleware import RedirectFallbackMiddleware
-from aldryn_redirects.models import StaticRedirect
+from aldryn_redirects.models import PrefixRedirect, Redirect, RegexRedirect, StaticRedirect
 
 
 class RedirectFallbackMiddlewareTestCase(TestCase):
@@ -15,6 +23,7 @@ class RedirectFallbackMiddlewareTestCase(TestCase):
 
         self.request = RequestFactory().get('http://example.com/path?query1=param1')
         self.site = Site.objects.get()
+        cache.clear()  # parler caches translations by primary key
 
     def test_redirect_found(self):
         redirect = StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest?keep=this')
@@ -26,5 +35,216 @@ class RedirectFallbackMiddlewareTestCase(TestCase):
         self.assertEquals(response.status_code, 301)
         self.assertEquals(response.url, 'http://example.com/dest?keep=this')
 
+    def test_redirect_found_with_a_single_query(self):
+        redirect = StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest')
+        redirect.sites.add(self.site)
+        redirect.query_params.create(key='query1', value='param1')
+        Site.objects.get_current()
+
+        with self.assertNumQueries(1):
+            response = RedirectFallbackMiddleware().process_request(self.request)
+        self.assertEquals(response.url, 'http://example.com/dest')
+
     def test_redirect_not_found(self):
         self.assertIsNone(RedirectFallbackMiddleware().process_request(self.request))
+
+    def test_redirect_not_found_with_two_queries(self):
+        PrefixRedirect.objects.create(inbound_prefix='/old-blog', outbound_route='/blog/').sites.add(self.site)
+        RedirectFallbackMiddleware().process_request(self.request)  # Loads the regex and prefix rules
+
+        # Exact rules only, the others are matched in memory.
+        with self.assertNumQueries(2):
+            self.assertIsNone(RedirectFallbackMiddleware().process_request(self.request))
+
+    def test_multilanguage_redirect_found(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/Path')
+        redirect.translations.create(language_code='en', new_path='/dest')
+
+        response = RedirectFallbackMiddleware().process_request(self.request)
+
+        self.assertEquals(response.status_code, 301)
+        self.assertEquals(response.url, '/dest')
+
+    def test_multilanguage_redirect_most_specific_wins(self):
+        Redirect.objects.create(site=self.site, old_path='/path').translations.create(
+            language_code='en', new_path='/dest')
+        Redirect.objects.create(site=self.site, old_path='/path?query1=param1').translations.create(
+            language_code='en', new_path='/dest/with/query')
+
+        response = RedirectFallbackMiddleware().process_request(self.request)
+
+        self.assertEquals(response.url, '/dest/with/query')
+
+    def test_multilanguage_redirect_without_target_is_gone(self):
+        Redirect.objects.create(site=self.site, old_path='/path')
+
+        response = RedirectFallbackMiddleware().process_request(self.request)
+
+        self.assertEquals(response.status_code, 410)
+
+    def test_multilanguage_redirect_uses_request_language_in_one_query(self):
+        redirect = Redirect.objects.create(site=self.site, old_path='/path')
+        redirect.translations.create(language_code='en', new_path='/dest/en')
+        redirect.translations.create(language_code='pt-br', new_path='/dest/pt-br')
+        request = RequestFactory().get('http://example.com/path', HTTP_ACCEPT_LANGUAGE='pt-br')
+
+        with self.assertNumQueries(2):  # static redirects, then multilanguage redirects
+            response = RedirectFallbackMiddleware().process_request(request)
+        self.assertEquals(response.url, '/dest/pt-br')
+
+        request = RequestFactory().get('http://example.com/path', HTTP_ACCEPT_LANGUAGE='de')
+        response = RedirectFallbackMiddleware().process_request(request)
+        self.assertEquals(response.url, '/dest/en')  # Falls back to the default language
+
+    def test_prefix_redirect(self):
+        redirect = PrefixRedirect.objects.create(inbound_prefix='/old-blog', outbound_route='/blog/')
+        redirect.sites.add(self.site)
+        PrefixRedirect.objects.create(
+            inbound_prefix='/old-blog/archive', outbound_route='/archive', keep_remainder=False,
+        ).sites.add(self.site)
+
+        request = RequestFactory().get('http://example.com/Old-Blog/2017/Post/?page=2')
+        response = RedirectFallbackMiddleware().process_request(request)
+        self.assertEquals(response.status_code, 301)
+        self.assertEquals(response.url, 'http://example.com/blog/2017/Post/?page=2')
+
+        request = RequestFactory().get('http://example.com/old-blog/archive/2017?page=2')
+        response = RedirectFallbackMiddleware().process_request(request)
+        self.assertEquals(response.url, 'http://example.com/archive')
+
+        request = RequestFactory().get('http://example.com/old-blogger')
+        self.assertIsNone(RedirectFallbackMiddleware().process_request(request))
+
+    def test_exact_rules_before_prefix_redirects(self):
+        PrefixRedirect.objects.create(inbound_prefix='/path', outbound_route='/prefix').sites.add(self.site)
+        redirect = Redirect.objects.create(site=self.site, old_path='/path?query1=param1')
+        redirect.translations.create(language_code='en', new_path='/exact')
+
+        response = RedirectFallbackMiddleware().process_request(self.request)
+        self.assertEquals(response.url, '/exact')
+
+    def test_regex_redirect(self):
+        redirect = RegexRedirect.objects.create(pattern=r'/product\.php\?id=(\d+)', replacement=r'/products/\1/')
+        redirect.sites.add(self.site)
+        PrefixRedirect.objects.create(inbound_prefix='/product.php', outbound_route='/products').sites.add(self.site)
+
+        request = RequestFactory().get('http://example.com/product.php?id=42')
+        response = RedirectFallbackMiddleware().process_request(request)
+        self.assertEquals(response.status_code, 301)
+        self.assertEquals(response.url, 'http://example.com/products/42/')
+
+        request = RequestFactory().get('http://example.com/product.php?id=x')
+        response = RedirectFallbackMiddleware().process_request(request)
+        self.assertEquals(response.url, 'http://example.com/products?id=x')
+
+    @skipIf(django.VERSION < (1, 10), 'New-style middleware requires Django 1.10')
+    def test_new_style_middleware(self):
+        StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest').sites.add(self.site)
+        middleware = RedirectFallbackMiddleware(lambda request: HttpResponse())
+
+        self.assertEquals(middleware(RequestFactory().get('/path')).url, 'http://example.com/dest')
+        self.assertEquals(middleware(RequestFactory().get('/other')).status_code, 200)
+
+
+@override_settings(
+    ALDRYN_REDIRECTS_EXCLUDED_PATHS=['/static/', '/media/', r'/health/?$', r'/[a-z]{2}/admin/'],
+    ALDRYN_REDIRECTS_METRICS_SINK='aldryn_redirects.metrics.MemorySink',
+)
+class ExcludedPathsTestCase(TestCase):
+    def setUp(self, *args, **kwargs):
+        super(ExcludedPathsTestCase, self).setUp(*args, **kwargs)
+        self.site = Site.objects.get()
+
+    def test_excluded_paths_skip_lookup(self):
+        StaticRedirect.objects.create(inbound_route='/health', outbound_route='/dest').sites.add(self.site)
+        StaticRedirect.objects.create(inbound_route='/healthy', outbound_route='/dest').sites.add(self.site)
+        middleware = RedirectFallbackMiddleware()
+
+        with self.assertNumQueries(0):
+            for path in ('/static/css/app.css', '/media/x.png', '/health', '/health/', '/en/admin/'):
+                self.assertIsNone(middleware.process_request(RequestFactory().get(path)))
+        self.assertEquals(get_sink().get_metrics()['counters']['lookups.excluded'], 5)
+
+        self.assertEquals(middleware.process_request(RequestFactory().get('/healthy')).status_code, 301)
+        self.assertIsNone(middleware.process_request(RequestFactory().get('/en/static/')))
+
+    def test_invalid_pattern(self):
+        with self.settings(ALDRYN_REDIRECTS_EXCLUDED_PATHS=['/static/', '(']):
+            with self.assertRaises(ImproperlyConfigured):
+                RedirectFallbackMiddleware().process_request(RequestFactory().get('/path'))
+
+
+@override_settings(ALDRYN_REDIRECTS_NOT_FOUND_ONLY=True)
+class NotFoundOnlyTestCase(TestCase):
+    def setUp(self, *args, **kwargs):
+        super(NotFoundOnlyTestCase, self).setUp(*args, **kwargs)
+        self.site = Site.objects.get()
+        self.request = RequestFactory().get('http://example.com/path')
+
+    def test_redirect_on_not_found(self):
+        StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest').sites.add(self.site)
+        middleware = RedirectFallbackMiddleware()
+        middleware.process_request(RequestFactory().get('/xxx'))  # Loads the eager redirects
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(middleware.process_request(self.request))
+
+        response = HttpResponse()
+        self.assertIs(middleware.process_response(self.request, response), response)
+        response = middleware.process_response(self.request, HttpResponse(status=404))
+        self.assertEquals(response.url, 'http://example.com/dest')
+
+        response = HttpResponse(status=404)
+        self.assertIs(middleware.process_response(RequestFactory().get('/xxx'), response), response)
+
+    def test_eager_redirect(self):
+        StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest', eager=True).sites.add(self.site)
+        middleware = RedirectFallbackMiddleware()
+
+        self.assertEquals(middleware.process_request(self.request).url, 'http://example.com/dest')
+
+        StaticRedirect.objects.update(eager=False)
+        StaticRedirect.objects.get().save()  # Invalidates the rules
+        self.assertIsNone(middleware.process_request(self.request))
+
+
+@skipIf(sys.version_info < (3, 5), 'The async path requires Python 3.5')
+@override_settings(
+    ALDRYN_REDIRECTS_ENGINE='aldryn_redirects.engines.TableEngine',
+    ALDRYN_REDIRECTS_REFRESH_INTERVAL=60,
+    ALDRYN_REDIRECTS_COUNT_HITS=False,
+)
+class AsyncRedirectFallbackMiddlewareTestCase(TestCase):
+    def setUp(self, *args, **kwargs):
+        super(AsyncRedirectFallbackMiddlewareTestCase, self).setUp(*args, **kwargs)
+        self.site = Site.objects.get()
+
+    def run_async(self, coroutine):
+        import asyncio
+
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def process_request(self, request):
+        return self.run_async(RedirectFallbackMiddleware().aprocess_request(request))
+
+    def test_resolved_in_memory(self):
+        StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest').sites.add(self.site)
+        RedirectFallbackMiddleware().process_request(RequestFactory().get('/xxx'))  # Builds the table
+
+        with self.assertNumQueries(0):
+            self.assertEquals(self.process_request(RequestFactory().get('/path')).url, 'http://example.com/dest')
+            self.assertIsNone(self.process_request(RequestFactory().get('/xxx')))
+
+    @override_settings(ALDRYN_REDIRECTS_NOT_FOUND_ONLY=True)
+    def test_redirect_on_not_found(self):
+        StaticRedirect.objects.create(inbound_route='/path', outbound_route='/dest').sites.add(self.site)
+        request = RequestFactory().get('/path')
+        middleware = RedirectFallbackMiddleware()
+        # Builds the tables
+        middleware.process_request(request)
+        middleware.process_response(request, HttpResponse(status=404))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.process_request(request))
+            response = self.run_async(middleware.aprocess_response(request, HttpResponse(status=404)))
+        self.assertEquals(response.url, 'http://example.com/dest')
@@ -5,7 +5,7 @@ from django.contrib.sites.models import Site
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from aldryn_redirects.models import StaticRedirect
+from aldryn_redirects.models import RegexRedirect, StaticRedirect
 
 
 class StaticRedirectTestCase(TestCase):
@@ -80,3 +80,26 @@ class StaticRedirectTestCase(TestCase):
         StaticRedirect.objects.all().delete()
 
         self.assertEquals(Site.objects.count(), site_count)
+
+
+class RegexRedirectTestCase(TestCase):
+    def test_sanity(self):
+        redirect = RegexRedirect(pattern=r'/(?P<slug>\w+)/(\d+)', replacement=r'/\g<slug>/\2')
+        redirect.full_clean()  # Nothing raised
+
+        redirect.pattern = r'/(\w+'
+        self.assertRaises(ValidationError, redirect.full_clean)
+
+        redirect.pattern = r'/(\w+)'
+        self.assertRaises(ValidationError, redirect.full_clean)  # Unknown groups
+
+        redirect.replacement = r'www.google.com/\1'
+        self.assertRaises(ValidationError, redirect.full_clean)
+
+    def test_host_not_chosen_by_groups(self):
+        redirect = RegexRedirect(pattern=r'/legacy/(.*)', replacement=r'/\1')
+        redirect.full_clean()  # Nothing raised
+
+        for replacement in (r'\1', r'http://\1', r'https://example.com\1', r'http://example.com@\1/'):
+            redirect.replacement = replacement
+            self.assertRaises(ValidationError, redirect.full_clean)
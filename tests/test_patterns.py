@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.test import SimpleTestCase
+
+from aldryn_redirects.patterns import RegexRuleSet
+
+
+class RegexRuleSetTestCase(SimpleTestCase):
+    def test_first_whole_match(self):
+        rules = RegexRuleSet([
+            (r'/product\.php\?id=(\d+)', 'product'),
+            (r'/(?P<page>\w+)\.php', 'page'),
+            (r'/(\w+)\.php', 'ignored'),
+            (r'(invalid', 'invalid'),
+        ])
+        self.assertEquals(len(rules), 3)
+        self.assertIsNotNone(rules.combined)
+
+        value, match = rules.match('/product.php?id=42')
+        self.assertEquals(value, 'product')
+        self.assertEquals(match.expand(r'/products/\1/'), '/products/42/')
+
+        value, match = rules.match('/about.php')
+        self.assertEquals(value, 'page')
+        self.assertEquals(match.expand(r'/\g<page>/'), '/about/')
+
+        self.assertIsNone(rules.match('/about.php/more'))
+        self.assertIsNone(rules.match('/product.php?id=x'))
+
+    def test_rules_not_combinable(self):
+        rules = RegexRuleSet([
+            (r'/a/(?P<slug>\w+)', 'a'),
+            (r'/b/(?P<slug>\w+)', 'b'),
+        ])
+        self.assertIsNone(rules.combined)
+        self.assertEquals(rules.match('/b/post')[0], 'b')
+        self.assertIsNone(rules.match('/c/post'))
+
+    def test_inline_flags(self):
+        rules = RegexRuleSet([
+            (r'/Shop/(\d+)', 'shop'),
+            (r'(?i)/legacy', 'legacy'),
+            (r'/(.+)/', 'page'),
+        ])
+        self.assertEquals(len(rules), 3)
+        self.assertIsNotNone(rules.combined)
+
+        self.assertIsNone(rules.match('/shop/12'))
+        self.assertEquals(rules.match('/shop/12/')[0], 'page')
+        self.assertEquals(rules.match('/LEGACY')[0], 'legacy')
+        self.assertEquals(rules.match('/Shop/12')[0], 'shop')
+
+    def test_numeric_backreferences(self):
+        rules = RegexRuleSet([
+            (r'/(\w+)', 'page'),
+            (r'/(\w+)/\1', 'repeated'),
+            (r'/(\w+)/(\w+)', 'pair'),
+        ])
+        value, match = rules.match('/foo/foo')
+        self.assertEquals(value, 'repeated')
+        self.assertEquals(match.expand(r'/\1/'), '/foo/')
+        self.assertEquals(rules.match('/foo/bar')[0], 'pair')
+        self.assertEquals(rules.match('/foo')[0], 'page')
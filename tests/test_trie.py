@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function, division
+
+from django.test import SimpleTestCase
+
+from aldryn_redirects.trie import PrefixTrie
+
+
+class PrefixTrieTestCase(SimpleTestCase):
+    def setUp(self):
+        self.trie = PrefixTrie()
+        self.trie.add('/old-blog', 'blog')
+        self.trie.add('/old-blog/News/', 'news')
+        self.trie.add('/old-blog', 'ignored')
+
+    def test_longest_prefix(self):
+        self.assertEquals(len(self.trie), 2)
+        self.assertEquals(self.trie.match('/old-blog'), ('blog', 1))
+        self.assertEquals(self.trie.match('/old-blog/post/'), ('blog', 1))
+        self.assertEquals(self.trie.match('/OLD-BLOG/news/2017/post'), ('news', 2))
+
+    def test_whole_segments(self):
+        self.assertIsNone(self.trie.match('/old-blogger'))
+        self.assertIsNone(self.trie.match('/'))
+        self.assertEquals(self.trie.match('/old-blog/newsletter'), ('blog', 1))